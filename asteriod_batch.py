@@ -0,0 +1,138 @@
+"""
+File: asteriod_batch.py
+This program runs headless asteroids episodes over a grid of game
+parameters and seeds on every core, and writes one row per episode
+to a columnar results file.
+
+Example:
+    python asteriod_batch.py --seeds 100 --rock-count 5 10 --bullet-life 30 60 --out results.npz
+    python asteriod_batch.py --seeds 100 --tick-rate 20 --out coarse.npz
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import asteriod_engine
+from asteriod_engine import Engine, BASE_TICK_RATE, TURN_LEFT, TURN_RIGHT, FIRE
+
+# The engine constants a sweep is allowed to change.
+SWEEP_PARAMETERS = ("INITIAL_ROCK_COUNT", "BIG_ROCK_SPEED", "BULLET_LIFE", "SHIP_THRUST_AMOUNT")
+
+# Episode lengths are counted in ticks at the base tick rate, whatever rate the engine runs at.
+DEFAULT_TICKS = 60 * 60
+FIRE_CHANCE = 0.1
+
+# Keeps the bot's random numbers apart from the engine's for the same seed.
+BOT_SEED_OFFSET = 1000003
+
+COLUMNS = ("seed", "tick_rate") + SWEEP_PARAMETERS + ("frames_survived", "rocks_destroyed", "rocks_left",
+                                                      "bullets_fired", "tick_time")
+
+# The engine constants before any sweep changed them.
+_DEFAULTS = {name: getattr(asteriod_engine, name) for name in SWEEP_PARAMETERS}
+
+def bot_inputs(rng, scale=1.0):
+    '''Return the actions of a simple scripted bot for one tick of scale base ticks.'''
+    inputs = [rng.choice((TURN_LEFT, TURN_RIGHT))]
+    if rng.random() < FIRE_CHANCE * scale:
+        inputs.append(FIRE)
+    return inputs
+
+def run_episode(seed, parameters, ticks=DEFAULT_TICKS, use_world=False, tick_rate=BASE_TICK_RATE):
+    '''Play one headless episode and return its summary.'''
+    # Workers are reused across tasks, so every sweep parameter is set for every task.
+    for name in SWEEP_PARAMETERS:
+        setattr(asteriod_engine, name, parameters.get(name, _DEFAULTS[name]))
+
+    # Swept collisions keep hits exact, so a coarse rate just needs fewer ticks.
+    engine = Engine(seed=seed, use_world=use_world, tick_rate=tick_rate)
+    limit = ticks / engine.tick_scale
+    rng = random.Random(seed + BOT_SEED_OFFSET)
+    start = time.perf_counter()
+    while engine.ticks < limit and engine.ship.alive and engine.asteriods:
+        engine.step(bot_inputs(rng, engine.tick_scale))
+    elapsed = time.perf_counter() - start
+
+    summary = {"seed": seed, "tick_rate": tick_rate}
+    for name in SWEEP_PARAMETERS:
+        summary[name] = getattr(asteriod_engine, name)
+    summary["frames_survived"] = int(round(engine.ticks * engine.tick_scale))
+    summary["rocks_destroyed"] = engine.rocks_destroyed
+    summary["rocks_left"] = len(engine.asteriods)
+    summary["bullets_fired"] = engine.bullets_fired
+    summary["tick_time"] = elapsed / max(engine.ticks, 1)
+    return summary
+
+def parameter_grid(values):
+    '''Return every combination of the swept values as a list of dictionaries.'''
+    names = [name for name in SWEEP_PARAMETERS if values.get(name)]
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*(values[name] for name in names))]
+
+def run_batch(seeds, grid, ticks=DEFAULT_TICKS, workers=None, use_world=False, on_result=None,
+              tick_rate=BASE_TICK_RATE):
+    '''Run every seed with every parameter set on a pool of worker processes.'''
+    columns = {name: [] for name in COLUMNS}
+
+    # Each worker process imports the engine once and then runs many episodes.
+    # The engine loads no assets, so nothing is read from disk per task.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_episode, seed, parameters, ticks, use_world, tick_rate)
+                   for parameters in grid for seed in seeds]
+
+        # Summaries stream back as soon as each episode ends.
+        for future in as_completed(futures):
+            summary = future.result()
+            for name in COLUMNS:
+                columns[name].append(summary[name])
+            if on_result is not None:
+                on_result(summary)
+    return {name: np.array(values) for name, values in columns.items()}
+
+def write_results(path, columns):
+    '''Write the results as one array per column.'''
+    np.savez(path, **columns)
+
+def main(argv=None):
+    '''Parse the command line, run the batch and write the results.'''
+    parser = argparse.ArgumentParser(description="Run headless asteroids episodes on every core.")
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds per parameter set")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="longest episode in base ticks")
+    parser.add_argument("--tick-rate", type=int, default=BASE_TICK_RATE,
+                        help="engine ticks a second; lower is coarser and faster")
+    parser.add_argument("--rock-count", type=int, nargs="+", help="values of INITIAL_ROCK_COUNT")
+    parser.add_argument("--rock-speed", type=float, nargs="+", help="values of BIG_ROCK_SPEED")
+    parser.add_argument("--bullet-life", type=int, nargs="+", help="values of BULLET_LIFE")
+    parser.add_argument("--thrust", type=float, nargs="+", help="values of SHIP_THRUST_AMOUNT")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--world", action="store_true", help="use the NumPy world")
+    parser.add_argument("--out", default="results.npz")
+    args = parser.parse_args(argv)
+
+    grid = parameter_grid({"INITIAL_ROCK_COUNT": args.rock_count,
+                           "BIG_ROCK_SPEED": args.rock_speed,
+                           "BULLET_LIFE": args.bullet_life,
+                           "SHIP_THRUST_AMOUNT": args.thrust})
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    total = len(grid) * len(seeds)
+    done = []
+
+    def report(summary):
+        done.append(summary)
+        print("[%d/%d] seed %d: %d frames, %d rocks destroyed, %.1f us/tick"
+              % (len(done), total, summary["seed"], summary["frames_survived"],
+                 summary["rocks_destroyed"], summary["tick_time"] * 1e6))
+
+    start = time.perf_counter()
+    columns = run_batch(seeds, grid, args.ticks, args.workers, args.world, report, args.tick_rate)
+    write_results(args.out, columns)
+    print("%d episodes in %.2f s, written to %s" % (total, time.perf_counter() - start, args.out))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+File: asteriod_bench.py
+This program benchmarks the game loop of the asteroids game.
+Every scenario is seeded, so two runs on the same machine measure the
+same work. Results are saved as a JSON baseline that a later run can be
+compared against.
+
+Examples:
+    python asteriod_bench.py run --out baseline.json
+    python asteriod_bench.py compare baseline.json new.json
+    python asteriod_bench.py memory
+    python asteriod_bench.py proximity --scenario rocks-5000-wide --ships 256
+    python asteriod_bench.py lod --screens 4 --ticks 2400
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from asteriod_engine import (Engine, Ship, Bullet, Large_Asteriods, Medium_Asteriods, Small_Asteriods,
+                             SCREEN_WIDTH, SCREEN_HEIGHT, BULLET_RADIUS, TURN_LEFT, FIRE)
+from asteriod_profiler import Phase_Timer, percentile
+from asteriod_spatial import wrap_delta
+
+ROCK_COUNTS = (5, 500, 5000, 50000)
+DEFAULT_TICKS = 200
+DEFAULT_SEED = 1
+
+# A "wide" scenario spreads its rocks over a world this many screens across and high.
+WIDE_SCREENS = 10
+
+# Ticks run under tracemalloc to find the peak memory of a scenario.
+MEMORY_TICKS = 5
+
+# Entities of each type built to measure the bytes one of them takes.
+MEMORY_ENTITIES = 10000
+
+# Ships querying the proximity index at once, the asteriods each one asks
+# for, and how far it looks around and ahead.
+PROXIMITY_SHIPS = 256
+PROXIMITY_K = 5
+PROXIMITY_RADIUS = 200
+PROXIMITY_RANGE = 400
+
+# Screens across of the world the far asteriod moves are checked in, and how far
+# a bulk-moved asteriod may land from where moving it every tick puts it.
+LOD_SCREENS = 4
+LOD_TOLERANCE = 1e-6
+
+# A metric getting worse by more than this fraction fails a comparison.
+DEFAULT_THRESHOLD = 0.10
+
+def scenario_names(rock_counts=ROCK_COUNTS):
+    '''Return the name of every scenario: each rock count with and without fire.'''
+    return ["rocks-%d%s" % (count, suffix) for count in rock_counts for suffix in ("", "-fire")]
+
+def build_scenario(name, seed, use_world):
+    '''Return an engine and the per-tick inputs of a named scenario.'''
+    parts = name.split("-")
+    rocks = int(parts[1])
+    screens = WIDE_SCREENS if "wide" in parts else 1
+    engine = Engine(SCREEN_WIDTH * screens, SCREEN_HEIGHT * screens, seed=seed, use_world=use_world)
+    while len(engine.asteriods) < rocks:
+        engine.asteriods.append(engine.acquire(engine.large_asteriod_pool))
+    inputs = [TURN_LEFT, FIRE] if "fire" in parts else [TURN_LEFT]
+    return engine, inputs
+
+def run_scenario(name, ticks=DEFAULT_TICKS, seed=DEFAULT_SEED, use_world=False, draw=None):
+    '''Run one scenario and return its timings.'''
+    engine, inputs = build_scenario(name, seed, use_world)
+    timer = Phase_Timer(engine)
+    tick_times = []
+    draw_times = []
+
+    for tick in range(ticks):
+        start = time.perf_counter()
+        engine.step(inputs)
+        tick_times.append(time.perf_counter() - start)
+        timer.end_tick()
+        if draw is not None:
+            draw_times.append(draw(engine))
+
+    total = sum(tick_times)
+    result = {"rocks": len(engine.asteriods),
+              "bullets": len(engine.bullets),
+              "ticks_per_sec": ticks / total if total else 0.0,
+              "tick_p50": percentile(tick_times, 0.50),
+              "tick_p99": percentile(tick_times, 0.99),
+              "peak_memory": measure_memory(name, seed, use_world),
+              "phases": {}}
+    for phase, samples in timer.samples.items():
+        result["phases"][phase] = {"mean": sum(samples) / len(samples),
+                                   "p50": percentile(samples, 0.50),
+                                   "p99": percentile(samples, 0.99)}
+    if draw_times:
+        result["phases"]["on_draw"] = {"mean": sum(draw_times) / len(draw_times),
+                                       "p50": percentile(draw_times, 0.50),
+                                       "p99": percentile(draw_times, 0.99)}
+    return result
+
+def measure_memory(name, seed, use_world):
+    '''Return the peak bytes allocated building a scenario and running a few ticks.'''
+    # Kept apart from the timed run because tracemalloc slows every allocation down.
+    tracemalloc.start()
+    try:
+        engine, inputs = build_scenario(name, seed, use_world)
+        for tick in range(MEMORY_TICKS):
+            engine.step(inputs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def entity_memory(count=MEMORY_ENTITIES, seed=DEFAULT_SEED):
+    '''Return the bytes tracemalloc sees allocated for one entity of each type, on average over count.'''
+    rng = random.Random(seed)
+    factories = {"ship": Ship, "bullet": Bullet, "large_asteriod": lambda: Large_Asteriods(rng),
+                 "medium_asteriod": Medium_Asteriods, "small_asteriod": Small_Asteriods}
+    sizes = {}
+    tracemalloc.start()
+    try:
+        for name, factory in factories.items():
+            # The list is allocated first so only the entities themselves are counted.
+            entities = [None] * count
+            before = tracemalloc.get_traced_memory()[0]
+            for index in range(count):
+                entities[index] = factory()
+            sizes[name] = (tracemalloc.get_traced_memory()[0] - before) / count
+            del entities
+    finally:
+        tracemalloc.stop()
+    return sizes
+
+def proximity_timings(name, ships=PROXIMITY_SHIPS, seed=DEFAULT_SEED):
+    '''Return the seconds the proximity index of a scenario takes to build and to answer a batch of ships.'''
+    import numpy as np
+
+    engine, inputs = build_scenario(name, seed, False)
+    engine.step(inputs)
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, (engine.width, engine.height), (ships, 2))
+    angles = rng.uniform(0, 360, ships)
+
+    timings = {}
+    start = time.perf_counter()
+    index = engine.proximity()
+    timings["build"] = time.perf_counter() - start
+    queries = {"nearest": lambda: index.nearest(points, PROXIMITY_K),
+               "within": lambda: index.within(points, PROXIMITY_RADIUS),
+               "raycast": lambda: index.raycast(points, angles, PROXIMITY_RANGE, BULLET_RADIUS)}
+    for query, answer in queries.items():
+        start = time.perf_counter()
+        answer()
+        timings[query] = time.perf_counter() - start
+
+    # The same nearest query by measuring every asteriod from every ship.
+    size = np.array([engine.width, engine.height])
+    start = time.perf_counter()
+    for point in points:
+        offsets = np.mod(index.pos - point + size / 2, size) - size / 2
+        np.argsort(np.hypot(offsets[:, 0], offsets[:, 1]) - index.radius)[:PROXIMITY_K]
+    timings["nearest_brute_force"] = time.perf_counter() - start
+    return timings
+
+def lod_errors(screens=LOD_SCREENS, ticks=DEFAULT_TICKS, seed=DEFAULT_SEED):
+    """
+    Play a wide world with far asteriods moved in bulk next to the same world moved every tick.
+    :return: the seconds each took, and the largest distance between the same asteriod in both
+    """
+    lod = Engine(SCREEN_WIDTH * screens, SCREEN_HEIGHT * screens, seed=seed)
+    full = Engine(SCREEN_WIDTH * screens, SCREEN_HEIGHT * screens, seed=seed)
+    full.lod_distance = None
+    if lod.lod_distance is None:
+        raise ValueError("a world %d screens across is too small for far asteriods" % screens)
+
+    # Turning only, so no bullet ever hits an asteriod in one game and not the other.
+    times = []
+    for engine in (lod, full):
+        start = time.perf_counter()
+        for tick in range(ticks):
+            engine.step([TURN_LEFT])
+        times.append(time.perf_counter() - start)
+
+    # An asteriod still waiting for its bulk move is compared where that move will put it.
+    worst = 0.0
+    last = lod.ticks - 1
+    for waiting, moved in zip(lod.asteriods, full.asteriods):
+        behind = last - waiting._lod_last if waiting._lod_next > last else 0
+        x = (waiting.center.get_x() + waiting.velocity.get_dx() * behind * lod.tick_scale) % lod.width
+        y = (waiting.center.get_y() + waiting.velocity.get_dy() * behind * lod.tick_scale) % lod.height
+        worst = max(worst, abs(wrap_delta(x - moved.center.get_x(), lod.width)),
+                    abs(wrap_delta(y - moved.center.get_y(), lod.height)))
+    return times[0], times[1], worst
+
+def make_drawer():
+    '''Return a function timing one on_draw of an engine in a hidden window.'''
+    import arcade
+    from asteriod_engine import SCREEN_WIDTH, SCREEN_HEIGHT, SHIP_IMAGE, BULLET_IMAGE, BIG_ROCK_IMAGE, MEDIUM_ROCK_IMAGE, SMALL_ROCK_IMAGE
+    from asteriod_render import Sprite_Renderer
+
+    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, visible=False)
+    renderer = Sprite_Renderer([SHIP_IMAGE, BULLET_IMAGE, BIG_ROCK_IMAGE, MEDIUM_ROCK_IMAGE, SMALL_ROCK_IMAGE])
+
+    def draw(engine):
+        start = time.perf_counter()
+        arcade.start_render()
+        ships = [engine.ship] if engine.ship.alive else []
+        renderer.draw(ships + engine.bullets + engine.asteriods, engine.world)
+        window.ctx.finish()
+        return time.perf_counter() - start
+    return draw
+
+def run(args):
+    '''Run the scenarios and write the results as a JSON baseline.'''
+    draw = make_drawer() if args.draw else None
+    results = {"meta": {"python": platform.python_version(),
+                        "machine": platform.machine(),
+                        "platform": platform.platform(),
+                        "ticks": args.ticks,
+                        "seed": args.seed,
+                        "world": args.world},
+               "scenarios": {}}
+    for name in args.scenarios or scenario_names():
+        result = run_scenario(name, args.ticks, args.seed, args.world, draw)
+        results["scenarios"][name] = result
+        print("%-18s %9.1f ticks/s  p50 %8.3f ms  p99 %8.3f ms  peak %8.1f MB"
+              % (name, result["ticks_per_sec"], result["tick_p50"] * 1e3,
+                 result["tick_p99"] * 1e3, result["peak_memory"] / 1e6))
+
+    with open(args.out, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print("Results written to %s" % args.out)
+    return 0
+
+def memory(args):
+    '''Print the bytes taken by one entity of each type.'''
+    for name, size in entity_memory(args.count, args.seed).items():
+        print("%-16s %7.1f bytes  %9.0f per MB" % (name, size, 1e6 / size))
+    return 0
+
+def proximity(args):
+    '''Print how long the proximity index takes for a batch of ships.'''
+    for query, seconds in proximity_timings(args.scenario, args.ships, args.seed).items():
+        print("%-20s %9.3f ms" % (query, seconds * 1e3))
+    return 0
+
+def lod(args):
+    '''Print how much far asteriods moved in bulk save, and check they land where moving them every tick does.'''
+    lod_time, full_time, worst = lod_errors(args.screens, args.ticks, args.seed)
+    print("bulk moves %.3f s, every tick %.3f s, worst distance %.3g" % (lod_time, full_time, worst))
+    if worst > LOD_TOLERANCE:
+        print("far asteriods moved in bulk drifted from the full-rate game")
+        return 1
+    return 0
+
+def compare(args):
+    '''Print how each scenario changed between two baselines. Return 1 on a regression.'''
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)["scenarios"]
+    with open(args.current) as current_file:
+        current = json.load(current_file)["scenarios"]
+
+    regressions = 0
+    for name in baseline:
+        if name not in current:
+            print("%-18s missing from %s" % (name, args.current))
+            continue
+        old, new = baseline[name], current[name]
+
+        # Throughput should not drop; latency and memory should not grow.
+        checks = [("ticks_per_sec", old["ticks_per_sec"], new["ticks_per_sec"], -1),
+                  ("tick_p50", old["tick_p50"], new["tick_p50"], 1),
+                  ("tick_p99", old["tick_p99"], new["tick_p99"], 1),
+                  ("peak_memory", old["peak_memory"], new["peak_memory"], 1)]
+        for phase in old["phases"]:
+            if phase in new["phases"]:
+                checks.append((phase, old["phases"][phase]["mean"], new["phases"][phase]["mean"], 1))
+
+        for metric, before, after, worse in checks:
+            change = (after - before) / before if before else 0.0
+            regressed = change * worse > args.threshold
+            regressions += regressed
+            print("%-18s %-18s %12.6g -> %12.6g  %+7.1f%%%s"
+                  % (name, metric, before, after, change * 100, "  REGRESSION" if regressed else ""))
+
+    print("%d regression(s) beyond %.0f%%" % (regressions, args.threshold * 100))
+    return 1 if regressions else 0
+
+def main(argv=None):
+    '''Parse the command line and run or compare benchmarks.'''
+    parser = argparse.ArgumentParser(description="Benchmark the asteroids game loop.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the scenarios and save a baseline")
+    run_parser.add_argument("--scenarios", nargs="+", help="scenario names, e.g. rocks-500-fire or rocks-5000-wide")
+    run_parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS)
+    run_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run_parser.add_argument("--world", action="store_true", help="use the NumPy world")
+    run_parser.add_argument("--draw", action="store_true", help="also time on_draw in a hidden window")
+    run_parser.add_argument("--out", default="bench.json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two baselines")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.set_defaults(handler=compare)
+
+    memory_parser = commands.add_parser("memory", help="report the bytes taken by each type of entity")
+    memory_parser.add_argument("--count", type=int, default=MEMORY_ENTITIES)
+    memory_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    memory_parser.set_defaults(handler=memory)
+
+    proximity_parser = commands.add_parser("proximity", help="time the proximity index for a batch of ships")
+    proximity_parser.add_argument("--scenario", default="rocks-5000-wide")
+    proximity_parser.add_argument("--ships", type=int, default=PROXIMITY_SHIPS)
+    proximity_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    proximity_parser.set_defaults(handler=proximity)
+
+    lod_parser = commands.add_parser("lod", help="check far asteriods moved in bulk against moving them every tick")
+    lod_parser.add_argument("--screens", type=int, default=LOD_SCREENS)
+    lod_parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS)
+    lod_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    lod_parser.set_defaults(handler=lod)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
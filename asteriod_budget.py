@@ -0,0 +1,124 @@
+"""
+File: asteriod_budget.py
+This module implements the frame budget of the asteroids game.
+Every frame reports what its update and its drawing cost. While the
+frames run over budget the game gives up non-essential work one level at
+a time, and it takes the work back once there is room again. Every
+change of level is logged, so stutter seen by a player can be matched
+with what the game was skipping at the time.
+"""
+import logging
+
+from asteriod_engine import Rock_Size
+from asteriod_spatial import wrap_delta
+
+# Seconds of update and drawing a frame may take, leaving room for arcade to present it.
+FRAME_BUDGET = 0.012
+
+# Weight of the newest frame in the smoothed frame cost.
+COST_SMOOTHING = 0.1
+
+# Frames over budget before giving up one more level of work, and frames
+# under RESTORE_FRACTION of the budget before taking one level back.
+DEGRADE_FRAMES = 10
+RESTORE_FRAMES = 60
+RESTORE_FRACTION = 0.6
+
+# Each level keeps every cut of the levels below it.
+LEVEL_FULL = 0
+LEVEL_PARTICLES = 1     # particles step every other tick
+LEVEL_SMALL_ROCKS = 2   # small asteriods far from the ship are not drawn
+LEVEL_COLLISIONS = 3    # bullets test medium and small asteriods every other tick
+MAX_LEVEL = LEVEL_COLLISIONS
+LEVEL_NAMES = {LEVEL_FULL: "full", LEVEL_PARTICLES: "particles", LEVEL_SMALL_ROCKS: "small rocks",
+               LEVEL_COLLISIONS: "collisions"}
+
+# Small asteriods closer than this to the ship are drawn at every level.
+NEAR_DISTANCE = 250
+
+logger = logging.getLogger(__name__)
+
+class Frame_Budget():
+    def __init__(self, budget=FRAME_BUDGET, max_level=MAX_LEVEL):
+        '''Intialize a budget of budget seconds a frame, at full fidelity.'''
+        self.budget = budget
+        self.max_level = max_level
+        self.level = LEVEL_FULL
+        self.cost = 0.0
+        self.frames = 0
+        self._over = 0
+        self._under = 0
+
+        # (frame, old level, new level, smoothed cost) of every change of level.
+        self.log = []
+
+    def end_frame(self, update_time, draw_time):
+        '''Add the cost of a frame and return the level of the next one.'''
+        frame_time = update_time + draw_time
+        self.frames += 1
+        if self.frames == 1:
+            self.cost = frame_time
+        else:
+            self.cost += (frame_time - self.cost) * COST_SMOOTHING
+
+        if self.cost > self.budget:
+            self._over += 1
+            self._under = 0
+            if self._over >= DEGRADE_FRAMES and self.level < self.max_level:
+                self._change(self.level + 1)
+        elif self.cost < self.budget * RESTORE_FRACTION:
+            self._under += 1
+            self._over = 0
+            if self._under >= RESTORE_FRAMES and self.level > LEVEL_FULL:
+                self._change(self.level - 1)
+        else:
+            self._over = 0
+            self._under = 0
+        return self.level
+
+    def _change(self, level):
+        '''Move to a new level and log it.'''
+        self.log.append((self.frames, self.level, level, self.cost))
+        logger.info("frame %d: degradation level %d (%s) -> %d (%s), frame cost %.2f ms of %.2f ms",
+                    self.frames, self.level, LEVEL_NAMES[self.level], level, LEVEL_NAMES[level],
+                    self.cost * 1e3, self.budget * 1e3)
+        self.level = level
+        self._over = 0
+        self._under = 0
+
+    def level_name(self):
+        '''Return the name of the current level.'''
+        return LEVEL_NAMES[self.level]
+
+    def particle_stride(self):
+        '''Return every how many ticks the particles should step.'''
+        return 2 if self.level >= LEVEL_PARTICLES else 1
+
+    def collision_stride(self):
+        '''Return every how many ticks bullets should test medium and small asteriods.'''
+        return 2 if self.level >= LEVEL_COLLISIONS else 1
+
+    def decimate(self, objects, ship, width, height):
+        """
+        Return the objects worth drawing at the current level.
+        :param objects: the objects about to be drawn
+        :param ship: the ship the view is about
+        :param width: width of the field, which wraps
+        :param height: height of the field, which wraps
+        """
+        if self.level < LEVEL_SMALL_ROCKS:
+            return objects
+        x = ship.center.get_x()
+        y = ship.center.get_y()
+        kept = []
+        for obj in objects:
+            if (getattr(obj, "size", None) != Rock_Size.SMALL or
+                    (abs(wrap_delta(obj.center.get_x() - x, width)) < NEAR_DISTANCE and
+                     abs(wrap_delta(obj.center.get_y() - y, height)) < NEAR_DISTANCE)):
+                kept.append(obj)
+        return kept
+
+    def stats(self):
+        '''Return the level, the smoothed frame cost and the budget.'''
+        return {"level": self.level, "name": self.level_name(), "cost": self.cost,
+                "budget": self.budget, "changes": len(self.log)}
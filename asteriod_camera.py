@@ -0,0 +1,60 @@
+"""
+File: asteriod_camera.py
+This module implements the camera of a scrolling asteroids world.
+The world can be many screens across and wraps at its own edges; the
+camera keeps the ship in the middle of the window and only the objects
+inside the view are handed to the renderer. Asteriods are found with a
+query of the collision grid instead of a scan of the whole list.
+"""
+from asteriod_spatial import wrap_delta
+
+# Extra room around the view, so a sprite whose center is just outside it still gets drawn.
+VIEW_MARGIN = 64
+
+class Camera():
+    def __init__(self, view_width, view_height, world_width, world_height):
+        '''Intialize a camera showing a view_width x view_height window of the world, centered on it.'''
+        self.view_width = view_width
+        self.view_height = view_height
+        self.world_width = world_width
+        self.world_height = world_height
+        self.x = world_width / 2
+        self.y = world_height / 2
+        self.visible_count = 0
+
+    def follow(self, obj, back=0.0):
+        '''Center the view where an object is drawn, back base ticks along its path.'''
+        self.x = obj.center.get_x() - obj.velocity.get_dx() * back
+        self.y = obj.center.get_y() - obj.velocity.get_dy() * back
+
+    def to_screen(self, x, y):
+        '''Return the window position of a world position, the closest way around the edges.'''
+        return (wrap_delta(x - self.x, self.world_width) + self.view_width / 2,
+                wrap_delta(y - self.y, self.world_height) + self.view_height / 2)
+
+    def to_screen_array(self, positions):
+        '''Turn an (N, 2) array of world positions into window positions, in place, and return it.'''
+        positions[:, 0] -= self.x - self.world_width / 2
+        positions[:, 0] %= self.world_width
+        positions[:, 0] += (self.view_width - self.world_width) / 2
+        positions[:, 1] -= self.y - self.world_height / 2
+        positions[:, 1] %= self.world_height
+        positions[:, 1] += (self.view_height - self.world_height) / 2
+        return positions
+
+    def sees(self, obj):
+        '''Return whether an object is inside the view.'''
+        x = wrap_delta(obj.center.get_x() - self.x, self.world_width)
+        y = wrap_delta(obj.center.get_y() - self.y, self.world_height)
+        return (abs(x) < self.view_width / 2 + VIEW_MARGIN and
+                abs(y) < self.view_height / 2 + VIEW_MARGIN)
+
+    def visible(self, engine):
+        '''Return the ship, bullets and asteriods of an engine inside the view.'''
+        ships = [ship for ship in engine.player_ships() if ship.alive and self.sees(ship)]
+        bullets = [bullet for bullet in engine.bullets if self.sees(bullet)]
+        asteriods = engine.visible_asteriods(self.x, self.y, self.view_width / 2 + VIEW_MARGIN,
+                                             self.view_height / 2 + VIEW_MARGIN)
+        objects = ships + bullets + asteriods
+        self.visible_count = len(objects)
+        return objects
@@ -0,0 +1,40 @@
+"""
+File: asteriod_clock.py
+This module implements a fixed-timestep clock for the asteroids game.
+Real elapsed time is collected in an accumulator and paid out as whole
+simulation ticks, so the game speed does not depend on the frame rate.
+"""
+
+# Never run more ticks than this in one frame, so a slow frame cannot
+# make the next one slower still.
+MAX_TICKS_PER_FRAME = 5
+
+class Fixed_Step_Clock():
+    def __init__(self, tick_rate, max_ticks_per_frame=MAX_TICKS_PER_FRAME):
+        '''Intialize a clock paying out tick_rate ticks a second.'''
+        self.tick_rate = tick_rate
+        self.tick_time = 1.0 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self._accumulator = 0.0
+        self.ticks = 0
+        self.dropped_time = 0.0
+
+    def advance(self, delta_time):
+        '''Add the time elapsed since the last frame and return how many ticks to run now.'''
+        self._accumulator += delta_time
+        ticks = int(self._accumulator // self.tick_time)
+
+        if ticks > self.max_ticks_per_frame:
+            # Give up on the time we cannot catch up with instead of spiralling.
+            dropped = ticks - self.max_ticks_per_frame
+            self.dropped_time += dropped * self.tick_time
+            ticks = self.max_ticks_per_frame
+            self._accumulator -= dropped * self.tick_time
+
+        self._accumulator -= ticks * self.tick_time
+        self.ticks += ticks
+        return ticks
+
+    def alpha(self):
+        '''Return how far the render time is between the last tick and the next one, from 0 to 1.'''
+        return self._accumulator / self.tick_time
@@ -0,0 +1,956 @@
+"""
+File: asteriod_engine.py
+This module implements the headless simulation of the asteroids game.
+It owns the flying objects, the random number generator and the game
+rules, and never touches arcade or textures.
+"""
+import math
+import random
+from abc import ABC, abstractmethod
+from enum import IntEnum
+from asteriod_motion import direction, normalize_angle, thrust
+from asteriod_pool import Pool
+from asteriod_proximity import Proximity_Index
+from asteriod_spatial import Spatial_Hash, time_of_impact, wrap_delta
+from asteriod_waves import Wave_Spawner
+from asteriod_world import World, World_Field
+
+# These are Global constants to use throughout the game
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+
+# Speeds, spins and lifetimes below are per tick at this many ticks a second.
+BASE_TICK_RATE = 60
+
+BULLET_RADIUS = 30
+BULLET_SPEED = 10
+BULLET_LIFE = 60
+
+SHIP_TURN_AMOUNT = 3
+SHIP_THRUST_AMOUNT = 0.25
+SHIP_RADIUS = 30
+
+INITIAL_ROCK_COUNT = 5
+
+BIG_ROCK_SPIN = 1
+BIG_ROCK_SPEED = 1.5
+BIG_ROCK_RADIUS = 15
+
+MEDIUM_ROCK_SPIN = -2
+MEDIUM_ROCK_RADIUS = 5
+
+SMALL_ROCK_SPIN = 5
+SMALL_ROCK_RADIUS = 2
+
+SHIP_IMAGE = "images/playerShip1_orange.png"
+BULLET_IMAGE = "images/laserBlue01.png"
+BIG_ROCK_IMAGE = "images/meteorGrey_big1.png"
+MEDIUM_ROCK_IMAGE = "images/meteorGrey_med1.png"
+SMALL_ROCK_IMAGE = "images/meteorGrey_small1.png"
+
+# Pool sizes. Five large rocks split into at most ten medium and twenty five small rocks.
+BULLET_POOL_SIZE = 32
+# Large rocks start twice over: those in play, and the next wave staged behind them.
+LARGE_ROCK_POOL_SIZE = INITIAL_ROCK_COUNT * 2
+MEDIUM_ROCK_POOL_SIZE = INITIAL_ROCK_COUNT * 2
+SMALL_ROCK_POOL_SIZE = INITIAL_ROCK_COUNT * 5
+
+# Collision grid. A cell is as wide as the farthest reach of a bullet or the ship to a rock center.
+MAX_ROCK_RADIUS = max(BIG_ROCK_RADIUS, MEDIUM_ROCK_RADIUS, SMALL_ROCK_RADIUS)
+COLLISION_CELL_SIZE = max(BULLET_RADIUS, SHIP_RADIUS) + MAX_ROCK_RADIUS
+
+# Names of the player actions understood by Engine.step.
+TURN_LEFT = "turn_left"
+TURN_RIGHT = "turn_right"
+THRUST = "thrust"
+REVERSE = "reverse"
+FIRE = "fire"
+
+# Keep every flying object in NumPy arrays and advance them all at once.
+USE_NUMPY_WORLD = False
+
+# Test collisions along the path moved during the tick instead of only where it ends,
+# so fast objects and coarse tick rates cannot pass through each other.
+USE_SWEPT_COLLISIONS = True
+
+# In a world much larger than the screen, asteriods farther than LOD_DISTANCE
+# from every ship are only moved every LOD_INTERVAL ticks, by all the ticks at once.
+# They stay out of the collision grid meanwhile, so the distance must be beyond
+# the reach of a bullet and the edge of the view.
+LOD_DISTANCE = 1200
+LOD_INTERVAL = 8
+
+# Once the field is cleared, a new wave as large as the first arrives.
+USE_WAVES = True
+
+class Rock_Size(IntEnum):
+    '''Size class of an asteriod, with the same codes as the vectorized environment.'''
+    SMALL = 1
+    MEDIUM = 2
+    LARGE = 3
+
+class Point():
+    __slots__ = ("_x", "_y")
+    
+    def __init__(self):
+        '''Intialize x and y coordinates of an object.'''
+        self._x = 0.0
+        self._y = 0.0
+        
+    def set_x(self, value):
+        '''Set x coordinate of an object.'''
+        self._x = value
+    
+    def set_y(self, value):
+        '''Set y coordinate of an object.'''
+        self._y = value
+    
+    def get_x(self):
+        '''Return x coordinate of an object.'''
+        return self._x
+    
+    def get_y(self):
+        '''Return y coordinate of an object.'''
+        return self._y
+    
+class Velocity():
+    __slots__ = ("_dx", "_dy")
+    
+    def __init__(self):
+        '''Intialize rate of change of x and y coordinates.'''
+        self._dx = 0.0
+        self._dy = 0.0
+        
+    def set_dx(self, value):
+        '''Set rate of change of the x coordinate of an object.'''
+        self._dx += value
+    
+    def set_dy(self, value):
+        '''Set rate of change of the y coordinate of an object.'''
+        self._dy += value
+        
+    def get_dx(self):
+        '''Return rate of change of the x coordinate of an object.'''
+        return self._dx
+    
+    def get_dy(self):
+        '''Return rate of change of the y coordinate of an object.'''
+        return self._dy
+    
+    def reset(self):
+        '''Stop the object.'''
+        self._dx = 0.0
+        self._dy = 0.0
+   
+class FlyingObject():
+    # Only what differs from one object to the next has a slot; the rest is on the class.
+    __slots__ = ("center", "velocity", "_local_angle", "_local_alive", "_alpha", "_world", "_row", "_plain")
+    
+    # Stored in the world arrays when the object is bound to a NumPy world.
+    _angle = World_Field("angle", float)
+    alive = World_Field("alive", bool)
+    
+    # Ships and bullets do not spin.
+    _spin = 0
+    radius = 0
+    
+    def __init__(self):
+        self._world = None
+        self._angle = 90
+        self.center = Point()
+        self.velocity = Velocity()
+        self.alive = True
+        self._alpha = 255 # For transparency, 1 means not transperent
+        
+    def set_vector(self, x_value, y_value):
+        '''Set vector of a flying object.'''
+        self.center.set_x(x_value)
+        self.center.set_y(y_value)
+        
+    def set_velocity(self, dx_value, dy_value):
+        '''Set velocity of a flying object.'''
+        self.velocity.set_dx(dx_value)
+        self.velocity.set_dy(dy_value)
+    
+    def set_angle(self, value):
+        '''Turn a flying object by value degrees.'''
+        self._angle = normalize_angle(self._angle + value)
+    
+    def get_angle(self):
+        '''Return angle of a flying object.'''
+        return self._angle
+        
+    def advance(self, scale=1.0):
+        '''Change position of flying object by scale base ticks.'''
+        self.set_vector(self.center.get_x() + self.velocity.get_dx() * scale, self.center.get_y() + self.velocity.get_dy() * scale)
+        
+    def is_off_screen(self, screen_width, screen_height):
+        '''Check whether flying object is off screen.'''
+        if self.center.get_x() > screen_width or self.center.get_y() > screen_height:
+            return True
+        elif self.center.get_x() < 0 or self.center.get_y() < 0:
+            return True
+        else:
+            return False
+
+class Ship(FlyingObject):
+    __slots__ = ()
+    
+    _img = SHIP_IMAGE
+    
+    # Read from the module when used, so a sweep that sets the constants reaches every ship.
+    @property
+    def radius(self):
+        '''Return the radius of the ship.'''
+        return SHIP_RADIUS
+    
+    @property
+    def turn_amount(self):
+        '''Return the degrees the ship turns a base tick.'''
+        return SHIP_TURN_AMOUNT
+    
+    @property
+    def thrust_amount(self):
+        '''Return the speed the ship gains a base tick of thrust.'''
+        return SHIP_THRUST_AMOUNT
+    
+    def __init__(self):
+        '''Intialize ship attributes.'''
+        super().__init__()
+        
+        # Set ship initial position
+        self.set_vector(SCREEN_WIDTH / 2, SCREEN_WIDTH - SCREEN_HEIGHT)
+        
+class Bullet(FlyingObject):
+    __slots__ = ("_local_life", "is_fired")
+    
+    _life = World_Field("life", float)
+    _speed = BULLET_SPEED
+    radius = BULLET_RADIUS
+    _img = BULLET_IMAGE
+    
+    def __init__(self):
+        '''Intialize bullet attributes.'''
+        super().__init__()
+        self._life = 0
+        self._alpha = 0
+        self.is_fired = False
+        self._angle = 0
+        
+        # Set bullet initial position.
+        self.set_vector(SCREEN_WIDTH / 2, SCREEN_WIDTH - SCREEN_HEIGHT)
+    
+    def reset(self):
+        '''Put a pooled bullet back in its freshly built state.'''
+        self.alive = True
+        self._life = 0
+        self._alpha = 0
+        self.is_fired = False
+        self._angle = 0
+        self.velocity.reset()
+        self.set_vector(SCREEN_WIDTH / 2, SCREEN_WIDTH - SCREEN_HEIGHT)
+    
+    def advance(self, scale=1.0):
+        '''Chang position of bullet by scale base ticks.'''
+        self.set_vector(self.center.get_x() + self.velocity.get_dx() * scale, self.center.get_y() + self.velocity.get_dy() * scale)
+        
+        # In bullet life to 60. Bullet is dead after 60 base frames.
+        self._life += scale
+        if self._life >= BULLET_LIFE:
+            self.alive = False
+    
+    def fire(self, angle):
+        '''Fire bullet from ship.'''
+        self._alpha = 255
+        dx, dy = direction(angle)
+        self.set_velocity(dx * self._speed, dy * self._speed)
+        self.is_fired = True        
+        
+class Asteriods(ABC):
+    # _lod_next is the tick a far asteriod is next due to move, _lod_last the tick it last moved.
+    __slots__ = ("center", "velocity", "_local_angle", "_local_alive", "is_hit", "_is_split",
+                 "_lod_next", "_lod_last", "_world", "_row", "_plain")
+    
+    # Stored in the world arrays when the asteriod is bound to a NumPy world.
+    _angle = World_Field("angle", float)
+    alive = World_Field("alive", bool)
+    
+    # Shared by every asteriod of a size; medium and small ones have always collided as points.
+    radius = 0
+    _alpha = 255
+    
+    def __init__(self):
+        '''Intialize asteriod attributes'''
+        self._world = None
+        self.center = Point()
+        self.velocity = Velocity()
+        self._angle = 0
+        self.alive = True
+        self.is_hit = False
+        self._is_split = False
+        self._lod_next = 0
+        self._lod_last = 0
+    
+    def reset(self):
+        '''Put a pooled asteriod back in its freshly built state.'''
+        self._angle = 0
+        self.alive = True
+        self.is_hit = False
+        self._is_split = False
+        self._lod_next = 0
+        self.velocity.reset()
+        self.set_vector(0.0, 0.0)
+        
+    @abstractmethod
+    def advance(self, scale=1.0):
+        '''Change position of asteriod by scale base ticks.'''
+        pass
+    
+    @abstractmethod
+    def split(self):
+        '''Split asteriod into smaller parts.'''
+        pass
+        
+    @abstractmethod
+    def is_off_screen(self, screen_width, screen_height):
+        '''Check whether asteriod is off screen.'''
+        pass
+    
+class Large_Asteriods(Asteriods):
+    __slots__ = ("_rng", "_width", "_height")
+    
+    size = Rock_Size.LARGE
+    radius = BIG_ROCK_RADIUS
+    _spin = BIG_ROCK_SPIN
+    _img = BIG_ROCK_IMAGE
+    
+    def __init__(self, rng=random, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        '''Intialize large asteriod attributes, somewhere in a width x height field.'''
+        super().__init__()
+        self._rng = rng
+        self._width = width
+        self._height = height
+        
+        # Set initial vector and velocity of large asteriod.
+        self.set_vector(self._rng.randint(0, self._width), self._rng.randint(0, self._height))
+        self.set_velocity(BIG_ROCK_SPEED * self._rng.randint(-1, 1), BIG_ROCK_SPEED * self._rng.randint(-1, 1))
+    
+    def reset(self):
+        '''Put a pooled large asteriod back at a new random place.'''
+        super().reset()
+        self.set_vector(self._rng.randint(0, self._width), self._rng.randint(0, self._height))
+        self.set_velocity(BIG_ROCK_SPEED * self._rng.randint(-1, 1), BIG_ROCK_SPEED * self._rng.randint(-1, 1))
+         
+    def set_vector(self, x_value, y_value):
+        '''Set vector of large asteriod.'''
+        self.center.set_x(x_value)
+        self.center.set_y(y_value)
+     
+    def set_velocity(self, dx_value, dy_value):
+        '''Set velocity of small asteriod.'''
+        self.velocity.set_dx(dx_value)
+        self.velocity.set_dy(dy_value)
+        
+    def advance(self, scale=1.0):
+        '''Change position of large asteriod by scale base ticks.'''
+        self._angle += BIG_ROCK_SPIN * scale
+        self.set_vector(self.center.get_x() + self.velocity.get_dx() * scale, self.center.get_y() + self.velocity.get_dy() * scale)
+     
+    def split(self):
+        '''Split large asteriod into two medium asteriods and one small asteriod.'''
+        self._is_split = True
+        self.alive = False
+        
+    def is_off_screen(self, screen_width, screen_height):
+        '''Check whether large asteriod is off screen.'''
+        if self.center.get_x() > screen_width or self.center.get_y() > screen_height:
+            return True
+        elif self.center.get_x() < 0 or self.center.get_y() < 0:
+            return True
+        else:
+            return False
+
+class Medium_Asteriods(Asteriods):
+    __slots__ = ()
+    
+    size = Rock_Size.MEDIUM
+    _spin = MEDIUM_ROCK_SPIN
+    _img = MEDIUM_ROCK_IMAGE
+    
+    def __init__(self):
+        '''Intialize medium asteriod attributes'''
+        super().__init__()
+        
+    def set_vector(self, x_value, y_value):
+        '''Set vector of medium asteriod.'''
+        self.center.set_x(x_value)
+        self.center.set_y(y_value)
+     
+    def set_velocity(self, dx_value, dy_value):
+        '''Set velocity of medium asteriod.'''
+        self.velocity.set_dx(dx_value)
+        self.velocity.set_dy(dy_value)
+        
+    def advance(self, scale=1.0):
+        '''Change position of medium asteriod by scale base ticks.'''
+        self._angle += MEDIUM_ROCK_SPIN * scale
+        self.set_vector(self.center.get_x() + self.velocity.get_dx() * scale, self.center.get_y() + self.velocity.get_dy() * scale)
+    
+    def split(self):
+        '''Split medium asteriod into two small asteriods.'''
+        self._is_split = True
+        self.alive = False
+        
+    def is_off_screen(self, screen_width, screen_height):
+        '''Check whether medium asteriod is off screen.'''
+        if self.center.get_x() > screen_width or self.center.get_y() > screen_height:
+            return True
+        elif self.center.get_x() < 0 or self.center.get_y() < 0:
+            return True
+        else:
+            return False
+    
+class Small_Asteriods(Asteriods):
+    __slots__ = ()
+    
+    size = Rock_Size.SMALL
+    _spin = SMALL_ROCK_SPIN
+    _img = SMALL_ROCK_IMAGE
+    
+    def __init__(self):
+        '''Intialize small asteriod attributes'''
+        super().__init__()
+        
+    def set_vector(self, x_value, y_value):
+        '''Set vector of small asteriod.'''
+        self.center.set_x(x_value)
+        self.center.set_y(y_value)
+     
+    def set_velocity(self, dx_value, dy_value):
+        '''Set velocity of small asteriod.'''
+        self.velocity.set_dx(dx_value)
+        self.velocity.set_dy(dy_value)
+        
+    def advance(self, scale=1.0):
+        '''Change position of small asteriod by scale base ticks.'''
+        self._angle += SMALL_ROCK_SPIN * scale
+        self.set_vector(self.center.get_x() + self.velocity.get_dx() * scale, self.center.get_y() + self.velocity.get_dy() * scale)
+        
+    def split(self):
+        '''Delete small asteriod'''
+        self.alive = False
+        
+    def is_off_screen(self, screen_width, screen_height):
+        '''Check whether small asteriod is off screen.'''
+        if self.center.get_x() > screen_width or self.center.get_y() > screen_height:
+            return True
+        elif self.center.get_x() < 0 or self.center.get_y() < 0:
+            return True
+        else:
+            return False
+
+class Engine():
+    """
+    This class owns the state of one game and moves it forward one tick
+    at a time. It never touches arcade or textures, so it runs headless
+    and as fast as the CPU allows.
+    """
+
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, seed=None, use_world=USE_NUMPY_WORLD,
+                 tick_rate=BASE_TICK_RATE):
+        """
+        Sets up the initial conditions of the game
+        :param width: World width, the screen width unless the view scrolls
+        :param height: World height, the screen height unless the view scrolls
+        :param seed: seed of the random number generator placing the asteriods
+        :param use_world: keep every flying object in NumPy arrays
+        :param tick_rate: ticks per second; the game plays at the same speed at any rate
+        """
+        self.width = width
+        self.height = height
+        self.tick_rate = tick_rate
+        self.tick_scale = BASE_TICK_RATE / tick_rate
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.ticks = 0
+        self.bullets_fired = 0
+        self.rocks_destroyed = 0
+
+        self.ship = Ship()
+        self.bullets = []
+        self.new_angle = 0
+        self.asteriods = []
+        
+        # Asteriods hit this tick, split once per tick by cleanup_zombies.
+        self.split_queue = []
+        
+        # Bullets test medium and small asteriods only every collision_stride ticks;
+        # large asteriods and ships are tested every tick. Raised by a game running over budget.
+        self.collision_stride = 1
+        
+        # Told about every split and every push of a ship's engine, to draw effects.
+        # It only watches: nothing it does changes the game.
+        self.emitter = None
+        
+        # Reuse bullets and asteriods instead of building new ones every frame.
+        self.bullet_pool = Pool(Bullet, BULLET_POOL_SIZE)
+        self.large_asteriod_pool = Pool(lambda: Large_Asteriods(self.rng, width, height), LARGE_ROCK_POOL_SIZE)
+        self.medium_asteriod_pool = Pool(Medium_Asteriods, MEDIUM_ROCK_POOL_SIZE)
+        self.small_asteriod_pool = Pool(Small_Asteriods, SMALL_ROCK_POOL_SIZE)
+        self.asteriod_pools = {Rock_Size.LARGE: self.large_asteriod_pool,
+                               Rock_Size.MEDIUM: self.medium_asteriod_pool,
+                               Rock_Size.SMALL: self.small_asteriod_pool}
+        
+        self.collision_grid = Spatial_Hash(COLLISION_CELL_SIZE, width, height)
+        
+        # The tick the grid was last built for; None once the asteriods list changed.
+        self._grid_tick = None
+        
+        # Built the first time a bot asks for it.
+        self._proximity = None
+        
+        # Nothing is ever far from the ship in a world no more than two LOD distances across.
+        self.lod_distance = None
+        if max(width, height) > 2 * LOD_DISTANCE:
+            self.lod_distance = LOD_DISTANCE
+        
+        self.world = None
+        if use_world:
+            self.world = World(width, height)
+            self.world.bind(self.ship)
+        
+        self.load_asteriods()
+        
+        self.waves = None
+        if USE_WAVES:
+            self.waves = Wave_Spawner(self, len(self.asteriods))
+
+    def step(self, inputs=()):
+        """
+        Move the game forward one tick.
+        :param inputs: the actions held this tick, with FIRE once for every shot
+        """
+        held = set()
+        if self.ship.alive:
+            for action in inputs:
+                if action == FIRE:
+                    self.fire()
+                else:
+                    held.add(action)
+
+        # Tell everything to advance or move forward one step in time
+        self.advance()
+                
+        # Check for keys, off-screen objects, collisions, and zombies
+        self.check_keys(held)
+        if self.world is None:
+            self.check_off_screen()
+        self.end_tick()
+
+    def end_tick(self):
+        '''Finish a tick once everything has moved: collisions, zombies, the next wave and the tick count.'''
+        self.check_collisions()
+        self.cleanup_zombies()
+        if self.waves is not None:
+            self.waves.update()
+        self.ticks += 1
+    
+    def advance(self):
+        '''Move every flying object forward one tick.'''
+        if self.world is not None:
+            # One vectorized step moves, spins, wraps and ages everything.
+            self.world.step(self.tick_scale)
+            return
+        
+        scale = self.tick_scale
+        self.ship.advance(scale)
+        
+        for bullet in self.bullets:
+            bullet.advance(scale)
+        
+        if self.lod_distance is not None:
+            self.advance_far(scale)
+            return
+        
+        for asteriod in self.asteriods:
+            asteriod.advance(scale)
+    
+    def advance_far(self, scale):
+        """
+        Move the asteriods near a ship forward one tick, and the far ones
+        every LOD_INTERVAL ticks by all the ticks they missed at once.
+        Asteriods move in straight lines, so the bulk update lands where
+        the ticks one by one would have.
+        :param scale: base ticks in one tick
+        """
+        tick = self.ticks
+        ships = self.player_ships()
+        for asteriod in self.asteriods:
+            if asteriod._lod_next > tick:
+                continue
+            if asteriod._lod_next:
+                asteriod.advance(scale * (tick - asteriod._lod_last))
+            else:
+                asteriod.advance(scale)
+            if self.is_far(asteriod, ships):
+                asteriod._lod_next = tick + LOD_INTERVAL
+                asteriod._lod_last = tick
+            else:
+                asteriod._lod_next = 0
+    
+    def is_far(self, obj, ships):
+        '''Return whether an object is beyond the LOD distance of every ship, around the edges.'''
+        x = obj.center.get_x()
+        y = obj.center.get_y()
+        for ship in ships:
+            if (abs(wrap_delta(x - ship.center.get_x(), self.width)) < self.lod_distance and
+                    abs(wrap_delta(y - ship.center.get_y(), self.height)) < self.lod_distance):
+                return False
+        return True
+
+    # Display 5 large asteriods a screen when game start. 
+    def load_asteriods(self):
+        screens = (self.width * self.height) // (SCREEN_WIDTH * SCREEN_HEIGHT)
+        for asteriod in range(INITIAL_ROCK_COUNT * max(1, screens)):
+            large_asteriods = self.acquire(self.large_asteriod_pool)
+            self.asteriods.append(large_asteriods)
+    
+    def acquire(self, pool):
+        '''Take an object from a pool and put it in the world.'''
+        obj = pool.acquire()
+        if self.world is not None:
+            self.world.bind(obj, BULLET_LIFE if isinstance(obj, Bullet) else 0)
+        return obj
+    
+    def release(self, pool, obj):
+        '''Take an object out of the world and give it back to its pool.'''
+        if self.world is not None:
+            self.world.unbind(obj)
+        pool.release(obj)
+    
+    def asteriod_pool(self, asteriod):
+        '''Return the pool an asteriod belongs to.'''
+        return self.asteriod_pools[asteriod.size]
+    
+    def pool_stats(self):
+        '''Return the usage of every pool, to size them for a wave configuration.'''
+        return {"bullets": self.bullet_pool.stats(),
+                "large_asteriods": self.large_asteriod_pool.stats(),
+                "medium_asteriods": self.medium_asteriod_pool.stats(),
+                "small_asteriods": self.small_asteriod_pool.stats()}
+    
+    def check_keys(self, held):
+        """
+        This function checks for actions that are being held down.
+        :param held: the set of actions held this tick
+        """
+        if TURN_LEFT in held:
+            # Reset ship angle then increment angle by 3
+            if self.new_angle >= 0:
+                self.new_angle = 0
+            self.new_angle += self.ship.turn_amount
+            
+            # Increment ship angle in anti-clockwise direction
+            self.ship.set_angle(self.new_angle * self.tick_scale)
+            
+        if TURN_RIGHT in held:
+            # Reset ship angle then decrement angle by 3
+            if self.new_angle <= 0:
+                self.new_angle = 0
+            self.new_angle -= self.ship.turn_amount                           
+            
+            # Increment ship angle in clockwise direction
+            self.ship.set_angle(self.new_angle * self.tick_scale)
+               
+        if THRUST in held:
+            # Accelerate ship along its heading.
+            self.accelerate_ship(self.ship, self.ship.thrust_amount * self.tick_scale)
+
+        if REVERSE in held:
+            # Deaccelerate ship against its heading.
+            self.accelerate_ship(self.ship, self.ship.thrust_amount * self.tick_scale * -1)
+
+        # Machine gun mode...
+        #if FIRE in held:
+            #for bullet in self.bullets:
+                #bullet.fire(self.ship.get_angle())
+        
+    def accelerate_ship(self, ship, amount):
+        '''Accelerate a ship by amount along its heading and tell the emitter.'''
+        ddx, ddy = thrust(ship.velocity, ship.get_angle(), amount)
+        if self.emitter is not None:
+            self.emitter.thrust(ship, ddx, ddy)
+    
+    def split_asteriod(self, asteriod):
+        '''Mark an asteriod as hit, queue its split for cleanup_zombies and tell the emitter.'''
+        asteriod.is_hit = True
+        asteriod.split()
+        self.split_queue.append(asteriod)
+        self.rocks_destroyed += 1
+        if self.emitter is not None:
+            self.emitter.split(asteriod)
+    
+    def fire(self):
+        '''Fire a bullet from the ship.'''
+        self.bullets_fired += 1
+        bullet = self.acquire(self.bullet_pool)
+        self.bullets.append(bullet)
+        
+        # Set bullet angle and vector corresponding to that of the ship.
+        if not self.bullets[0].is_fired:
+            self.bullets[0].set_angle(self.ship.get_angle())
+            self.bullets[0].set_vector(self.ship.center.get_x(), self.ship.center.get_y())
+        
+        # Fire!
+        self.bullets[0].fire(self.ship.get_angle())
+
+    def check_off_screen(self):
+        """
+        Checks to see if ship or bullets or asteriods have left the screen
+        and if so, display them on the opposite side of the screen, as far
+        past the edge as they went, the same as the NumPy world wraps them.
+        :return:
+        """
+        self.wrap(self.ship)
+        for bullet in self.bullets:
+            self.wrap(bullet)
+                
+        # Far asteriods only need wrapping on the ticks they make their bulk move.
+        asteriods = self.asteriods
+        if self.lod_distance is not None:
+            tick = self.ticks
+            asteriods = [asteriod for asteriod in asteriods
+                         if asteriod._lod_next <= tick or asteriod._lod_last == tick]
+        
+        for asteriod in asteriods:
+            self.wrap(asteriod)
+    
+    def wrap(self, obj):
+        '''Bring an object that left the field back in on the other side, keeping how far past the edge it went.'''
+        x = obj.center.get_x()
+        y = obj.center.get_y()
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            obj.center.set_x(x % self.width)
+            obj.center.set_y(y % self.height)
+
+    def cleanup_zombies(self):
+        """
+        Splits the asteriods hit this tick, then removes any dead bullets
+        or asteriods from the lists in one pass, keeping the order of the rest.
+        :return:
+        """
+        asteriods = self.asteriods
+        
+        # Every split is read from its dead parent before any parent goes back to its pool.
+        for asteriod in self.split_queue:
+            # If asteriod is a large one: 
+            if asteriod.size == Rock_Size.LARGE:
+                # Take group 1 asteriods that would replace a large asteriod from the pools.
+                medium_asteriod_1 = self.acquire(self.medium_asteriod_pool)
+                medium_asteriod_2 = self.acquire(self.medium_asteriod_pool)
+                small_asteriod = self.acquire(self.small_asteriod_pool)
+                
+                # Set vectors of the intantiated group 1 asteriods.
+                medium_asteriod_1.set_vector(asteriod.center.get_x() + 20, asteriod.center.get_y() + 20)
+                medium_asteriod_2.set_vector(asteriod.center.get_x() - 20, asteriod.center.get_y() - 20)
+                small_asteriod.set_vector(asteriod.center.get_x() + 20, asteriod.center.get_y() - 20)
+                
+                # Set velocity of the intantiated group 1 asteriods.
+                medium_asteriod_1.set_velocity(asteriod.velocity.get_dx() + 2, asteriod.velocity.get_dy() + 2)
+                medium_asteriod_2.set_velocity((asteriod.velocity.get_dx() + 2) * -1, (asteriod.velocity.get_dy() + 2) * -1)
+                small_asteriod.set_velocity(asteriod.velocity.get_dx() + 2, 0)
+                
+                # Put group 1 asteriods in the game.
+                asteriods.append(medium_asteriod_1)
+                asteriods.append(medium_asteriod_2)
+                asteriods.append(small_asteriod)
+                
+            # Otherwise, if asteriod is a medium one: 
+            elif asteriod.size == Rock_Size.MEDIUM:
+                # Take group 2 asteriods that would replace a medium asteriod from the pools.
+                small_asteriod_1 = self.acquire(self.small_asteriod_pool)
+                small_asteriod_2 = self.acquire(self.small_asteriod_pool)
+                
+                # Set vectors of the intantiated group 2 asteriods.
+                small_asteriod_1.set_vector(asteriod.center.get_x() + 20, asteriod.center.get_y() + 20)
+                small_asteriod_2.set_vector(asteriod.center.get_x() - 20, asteriod.center.get_y() - 20)
+                
+                # Set velocity of the intantiated group 2 asteriods.
+                small_asteriod_1.set_velocity(asteriod.velocity.get_dx() + 1.5, asteriod.velocity.get_dy() + 1.5)
+                small_asteriod_2.set_velocity((asteriod.velocity.get_dx() + 1.5) * -1, (asteriod.velocity.get_dy() + 1.5) * -1)
+                
+                # Put group 2 asteriods in the game.
+                asteriods.append(small_asteriod_1)
+                asteriods.append(small_asteriod_2)
+        if self.split_queue:
+            # The grid no longer matches the list, for anyone querying it between ticks.
+            self._grid_tick = None
+        del self.split_queue[:]
+        
+        # Move every live bullet down over the dead ones, then cut the tail.
+        bullets = self.bullets
+        kept = 0
+        for bullet in bullets:
+            if bullet.alive:
+                bullets[kept] = bullet
+                kept += 1
+            else:
+                self.release(self.bullet_pool, bullet)
+        del bullets[kept:]
+        
+        # Same for the asteriods; the children added above are alive and stay at the end.
+        kept = 0
+        for asteriod in asteriods:
+            if asteriod.alive:
+                asteriods[kept] = asteriod
+                kept += 1
+            else:
+                self.release(self.asteriod_pool(asteriod), asteriod)
+        if kept < len(asteriods):
+            self._grid_tick = None
+        del asteriods[kept:]
+            
+    def impact_time(self, obj, asteriod):
+        """
+        Return when during the last tick an object hit an asteriod, or None.
+        :param obj: a bullet or the ship
+        :param asteriod: the asteriod to test against
+        :return: the fraction of the tick at which they touched, 0 if they overlapped from the start
+        """
+        too_close = obj.radius + asteriod.radius
+        x = asteriod.center.get_x() - obj.center.get_x()
+        y = asteriod.center.get_y() - obj.center.get_y()
+        if not USE_SWEPT_COLLISIONS:
+            return 0.0 if abs(x) < too_close and abs(y) < too_close else None
+        
+        # Closest way around the screen at the end of the tick, then back along the relative path.
+        x = wrap_delta(x, self.width)
+        y = wrap_delta(y, self.height)
+        dx = (asteriod.velocity.get_dx() - obj.velocity.get_dx()) * self.tick_scale
+        dy = (asteriod.velocity.get_dy() - obj.velocity.get_dy()) * self.tick_scale
+        return time_of_impact(x - dx, y - dy, dx, dy, too_close)
+    
+    def check_collisions(self):
+        """
+        Checks to see if bullets have hit asteriods.
+        If true, break asteriod into medium or smaller parts.
+        Also check if asteriods have hit the ship. If true break
+        asteriod into medium and smaller parts.
+        :return:
+        """
+        # Broad phase: each bullet only checks the asteriods in its neighbouring cells.
+        rock_travel = self.build_grid(self.ticks)
+        grid = self.collision_grid
+        large_only = self.ticks % self.collision_stride != 0
+        
+        for bullet in self.bullets:
+            if not bullet.alive:
+                continue
+            
+            reach = bullet.radius + MAX_ROCK_RADIUS
+            if USE_SWEPT_COLLISIONS:
+                reach += rock_travel + math.hypot(bullet.velocity.get_dx(), bullet.velocity.get_dy()) * self.tick_scale
+            
+            # The bullet stops at the first asteriod it reaches during the tick.
+            hit = None
+            first = None
+            for index in grid.query(bullet.center.get_x(), bullet.center.get_y(), reach):
+                asteriod = self.asteriods[index]
+                
+                # Make sure it is alive before checking for a collision
+                if asteriod.alive and not (large_only and asteriod.size != Rock_Size.LARGE):
+                    time = self.impact_time(bullet, asteriod)
+                    if time is not None and (first is None or time < first):
+                        hit = asteriod
+                        first = time
+            
+            if hit is not None:
+                # its a hit!
+                bullet.alive = False
+                self.split_asteriod(hit)
+
+        for ship in self.player_ships():
+            self.collide_ship(ship, rock_travel)
+    
+    def build_grid(self, tick):
+        """
+        Put every asteriod that moved in a tick in the collision grid, in list order.
+        Far asteriods waiting for their bulk move stay out of it.
+        :param tick: the tick being played
+        :return: the farthest any asteriod moved in the tick
+        """
+        grid = self.collision_grid
+        grid.clear()
+        rock_travel = 0.0
+        if self.world is not None:
+            # The NumPy world has no far asteriods; read every position and speed in bulk.
+            rows = [asteriod._row for asteriod in self.asteriods]
+            grid.insert_array(self.world.pos[rows])
+            if USE_SWEPT_COLLISIONS:
+                rock_travel = self.world.max_speed(rows)
+            self._grid_tick = tick
+            return rock_travel * self.tick_scale
+        
+        for index, asteriod in enumerate(self.asteriods):
+            if asteriod._lod_next > tick:
+                continue
+            grid.insert(index, asteriod.center.get_x(), asteriod.center.get_y())
+            if USE_SWEPT_COLLISIONS:
+                rock_travel = max(rock_travel, math.hypot(asteriod.velocity.get_dx(), asteriod.velocity.get_dy()))
+        self._grid_tick = tick
+        
+        # A swept hit can be as far from the end positions as both objects moved this tick.
+        return rock_travel * self.tick_scale
+    
+    def visible_asteriods(self, x, y, half_width, half_height):
+        """
+        Return the asteriods within a box around a point, from the collision grid.
+        The grid is only rebuilt when the list changed since the last tick built it.
+        :param x: x of the center of the box
+        :param y: y of the center of the box
+        :param half_width: half the width of the box
+        :param half_height: half the height of the box
+        """
+        if self._grid_tick != self.ticks - 1:
+            # Built before the last tick's cleanup changed the list, or never built.
+            self.build_grid(self.ticks - 1)
+        asteriods = self.asteriods
+        return [asteriods[index] for index in self.collision_grid.query(x, y, half_width, half_height)]
+    
+    def proximity(self):
+        '''Return the proximity index of the asteriods, rebuilt at most once a tick.'''
+        if self._proximity is None:
+            self._proximity = Proximity_Index(self.width, self.height)
+        self._proximity.update(self)
+        return self._proximity
+    
+    def player_ships(self):
+        '''Return the ships that can hit asteriods.'''
+        return (self.ship,)
+    
+    def collide_ship(self, ship, rock_travel):
+        """
+        Checks to see if asteriods have hit a ship, using the grid built by check_collisions.
+        :param ship: the ship to check
+        :param rock_travel: the farthest any asteriod moved this tick
+        """
+        grid = self.collision_grid
+        reach = ship.radius + MAX_ROCK_RADIUS
+        if USE_SWEPT_COLLISIONS:
+            reach += rock_travel + math.hypot(ship.velocity.get_dx(), ship.velocity.get_dy()) * self.tick_scale
+        for index in grid.query(ship.center.get_x(), ship.center.get_y(), reach):
+            asteriod = self.asteriods[index]
+            
+            # Make sure they are both alive before checking for a collision
+            if ship.alive and asteriod.alive:
+                if self.impact_time(ship, asteriod) is not None:
+                    
+                    # Ship would destroy if hit by a large asteriod.
+                    """
+                    if asteriod.size == Rock_Size.LARGE:
+                        ship.alive = False
+                    """
+                    # its a hit!
+                    self.split_asteriod(asteriod)
+                        # We will wait to remove the dead objects until after we
+                        # finish going through the list
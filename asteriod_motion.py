@@ -0,0 +1,75 @@
+"""
+File: asteriod_motion.py
+This module implements the headings of the asteroids game.
+Angles are whole degrees almost everywhere in the game, so the unit
+vector of every degree is computed once into a 360-entry table and a
+heading is a table lookup instead of a trigonometry call. Every function
+has a scalar form for single objects and an array form for NumPy batches.
+"""
+import math
+
+from asteriod_numpy import np
+
+DIRECTIONS = 360
+
+def _table(function, quarter_turns):
+    '''Return function of every whole degree, with exact values at the quarter turns.'''
+    table = [function(math.radians(degree)) for degree in range(DIRECTIONS)]
+    for degree, value in zip((0, 90, 180, 270), quarter_turns):
+        table[degree] = value
+    return table
+
+COS_TABLE = _table(math.cos, (1.0, 0.0, -1.0, 0.0))
+SIN_TABLE = _table(math.sin, (0.0, 1.0, 0.0, -1.0))
+
+# The same tables as one (DIRECTIONS, 2) array, for the array functions, which need numpy.
+_direction_array = None
+if np is not None:
+    _direction_array = np.array([COS_TABLE, SIN_TABLE], dtype=np.float64).T.copy()
+
+def normalize_angle(angle):
+    '''Return an angle in degrees folded into [0, 360).'''
+    angle %= DIRECTIONS
+    # A tiny negative angle folds to exactly 360.0 in floating point.
+    return 0.0 if angle == DIRECTIONS else angle
+
+def direction_index(angle):
+    '''Return the table row of the whole degree nearest to an angle.'''
+    return int(math.floor(angle + 0.5)) % DIRECTIONS
+
+def direction(angle):
+    '''Return the unit vector (dx, dy) pointing along an angle in degrees.'''
+    index = direction_index(angle)
+    return COS_TABLE[index], SIN_TABLE[index]
+
+def thrust(velocity, angle, amount):
+    '''Add amount to a velocity along an angle in degrees and return the (ddx, ddy) added.'''
+    index = direction_index(angle)
+    ddx = COS_TABLE[index] * amount
+    ddy = SIN_TABLE[index] * amount
+    velocity.set_dx(ddx)
+    velocity.set_dy(ddy)
+    return ddx, ddy
+
+def normalize_angles(angles):
+    '''Fold an array of angles in degrees into [0, 360) in place and return it.'''
+    np.mod(angles, DIRECTIONS, out=angles)
+    angles[angles == DIRECTIONS] = 0.0
+    return angles
+
+def direction_indices(angles):
+    '''Return the table rows of the whole degrees nearest to an array of angles.'''
+    return np.floor(np.asarray(angles, dtype=np.float64) + 0.5).astype(np.intp) % DIRECTIONS
+
+def directions(angles):
+    '''Return the (N, 2) unit vectors pointing along an array of angles in degrees.'''
+    return _direction_array[direction_indices(angles)]
+
+def thrust_many(velocities, angles, amounts):
+    """
+    Add thrust to many velocities at once, in place.
+    :param velocities: (N, 2) array of velocities
+    :param angles: N angles in degrees
+    :param amounts: N amounts, or one amount for every velocity
+    """
+    velocities += directions(angles) * np.asarray(amounts, dtype=np.float64).reshape(-1, 1)
@@ -0,0 +1,216 @@
+"""
+File: asteriod_net.py
+This module implements the wire protocol of the multiplayer asteroids game.
+Every message is a length-prefixed frame over TCP. The server sends the
+field as quantized entity records, and each update only holds the records
+that changed since the last state the client acknowledged.
+"""
+import collections
+import socket
+import struct
+from array import array
+
+from asteriod_engine import (Point, Velocity, SHIP_IMAGE, BULLET_IMAGE, BIG_ROCK_IMAGE,
+                             MEDIUM_ROCK_IMAGE, SMALL_ROCK_IMAGE)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7878
+
+# payload length, message type
+FRAME = struct.Struct("<IB")
+WELCOME = 1
+INPUT = 2
+STATE = 3
+
+# player net id, field width, field height, tick rate
+WELCOME_MESSAGE = struct.Struct("<HHHH")
+
+# last tick applied by the client, held actions mask, shots since the last input
+INPUT_MESSAGE = struct.Struct("<IBB")
+
+# tick, base tick (0 for a full state), server send time, server tick time, changed, removed
+STATE_HEADER = struct.Struct("<IIdfHH")
+
+# net id, kind, x, y, angle
+ENTITY = struct.Struct("<HBHHB")
+
+# Kinds of entity and the image each one is drawn with.
+SHIP = 1
+BULLET = 2
+LARGE = 3
+MEDIUM = 4
+SMALL = 5
+KIND_IMAGES = {SHIP: SHIP_IMAGE, BULLET: BULLET_IMAGE, LARGE: BIG_ROCK_IMAGE,
+               MEDIUM: MEDIUM_ROCK_IMAGE, SMALL: SMALL_ROCK_IMAGE}
+
+# A position is a 16-bit fraction of the field, an angle an 8-bit fraction of a turn.
+POSITION_STEPS = 1 << 16
+ANGLE_STEPS = 1 << 8
+
+# States a client keeps so the server can send deltas against any recent one.
+HISTORY_TICKS = 64
+
+def frame(message_type, payload):
+    '''Return a message ready to be written to a stream.'''
+    return FRAME.pack(len(payload), message_type) + payload
+
+def quantize(value, size, steps):
+    '''Return value, from 0 to size, as a whole number of steps wrapping at size.'''
+    return int(value * steps / size) % steps
+
+def dequantize(step, size, steps):
+    '''Return the value of a whole number of steps.'''
+    return step * size / steps
+
+def encode_delta(current, base):
+    """
+    Return the changed and removed parts of a state update.
+    :param current: {net id: packed entity record} of the tick being sent
+    :param base: the same for the tick the client acknowledged, empty for a full state
+    :return: the concatenated changed records, the removed net ids, and how many of each
+    """
+    changed = [record for net_id, record in current.items() if base.get(net_id) != record]
+    removed = array("H", (net_id for net_id in base if net_id not in current))
+    return b"".join(changed), removed.tobytes(), len(changed), len(removed)
+
+class Frame_Reader():
+    def __init__(self):
+        '''Intialize an empty buffer of received bytes.'''
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        '''Add received bytes and return every whole (message type, payload) frame now complete.'''
+        self._buffer += data
+        frames = []
+        offset = 0
+        while len(self._buffer) - offset >= FRAME.size:
+            length, message_type = FRAME.unpack_from(self._buffer, offset)
+            end = offset + FRAME.size + length
+            if end > len(self._buffer):
+                break
+            frames.append((message_type, bytes(self._buffer[offset + FRAME.size:end])))
+            offset = end
+        del self._buffer[:offset]
+        return frames
+
+class State_Decoder():
+    """
+    This class rebuilds the full field from state updates. It keeps the
+    last few states it applied, since the server may send a delta against
+    any of them while acknowledgements are in flight.
+    """
+
+    def __init__(self, width, height, history=HISTORY_TICKS):
+        '''Intialize a decoder for a width x height field.'''
+        self.width = width
+        self.height = height
+        self._history = history
+        self._states = collections.OrderedDict()
+        self._entities = None
+        self.tick = 0
+        self.server_time = 0.0
+        self.tick_time = 0.0
+
+    def apply(self, payload):
+        '''Apply one state update and return its tick.'''
+        tick, base_tick, self.server_time, self.tick_time, changed, removed = STATE_HEADER.unpack_from(payload)
+        if tick <= self.tick:
+            # Late or repeated; a newer state is already applied.
+            return self.tick
+        if base_tick and base_tick not in self._states:
+            raise ValueError("state %d is a delta against unknown state %d" % (tick, base_tick))
+
+        records = dict(self._states.get(base_tick, {}))
+        offset = STATE_HEADER.size
+        for index in range(changed):
+            net_id = ENTITY.unpack_from(payload, offset)[0]
+            records[net_id] = payload[offset:offset + ENTITY.size]
+            offset += ENTITY.size
+        for net_id in array("H", payload[offset:offset + removed * 2]):
+            records.pop(net_id, None)
+
+        # Ticks only go up, so the oldest states are at the front, however many were skipped.
+        self._states[tick] = records
+        states = self._states
+        while next(iter(states)) <= tick - self._history:
+            states.popitem(last=False)
+        self.tick = tick
+        self._entities = None
+        return tick
+
+    def entities(self):
+        '''Return {net id: (kind, x, y, angle)} of the field at the last tick applied.'''
+        # Only unpacked when asked for, so a client that skips frames skips the work.
+        if self._entities is None:
+            entities = {}
+            for record in self._states.get(self.tick, {}).values():
+                net_id, kind, x, y, angle = ENTITY.unpack(record)
+                entities[net_id] = (kind, dequantize(x, self.width, POSITION_STEPS),
+                                    dequantize(y, self.height, POSITION_STEPS), dequantize(angle, 360, ANGLE_STEPS))
+            self._entities = entities
+        return self._entities
+
+class Remote_Object():
+    __slots__ = ("center", "velocity", "_angle", "kind", "_img")
+
+    # Drawn like an asteriod that does not move between states.
+    _spin = 0
+    _alpha = 255
+
+    def __init__(self, kind):
+        '''Intialize a drawable stand-in for an entity of the server.'''
+        self.center = Point()
+        self.velocity = Velocity()
+        self._angle = 0.0
+        self.kind = kind
+        self._img = KIND_IMAGES[kind]
+
+class Net_Client():
+    """
+    This class is a blocking-free client for a game loop that cannot await:
+    every call sends or reads only what the socket can take right away.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        '''Connect to a server and wait for its welcome.'''
+        self._socket = socket.create_connection((host, port))
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = Frame_Reader()
+        frames = []
+        while not frames:
+            frames = self._reader.feed(self._socket.recv(4096))
+        message_type, payload = frames.pop(0)
+        self.player, self.width, self.height, self.tick_rate = WELCOME_MESSAGE.unpack(payload)
+        self.decoder = State_Decoder(self.width, self.height)
+        self._pending = frames
+        self._socket.setblocking(False)
+        self.closed = False
+
+    def send_input(self, mask, shots):
+        '''Send the held actions and new shots, acknowledging the last state applied.'''
+        try:
+            self._socket.send(frame(INPUT, INPUT_MESSAGE.pack(self.decoder.tick, mask, shots)))
+        except BlockingIOError:
+            pass
+
+    def poll(self):
+        '''Apply every state received so far and return the entities of the field.'''
+        frames, self._pending = self._pending, []
+        while not self.closed:
+            try:
+                data = self._socket.recv(65536)
+            except BlockingIOError:
+                break
+            if not data:
+                self.closed = True
+                break
+            frames.extend(self._reader.feed(data))
+        for message_type, payload in frames:
+            if message_type == STATE:
+                self.decoder.apply(payload)
+        return self.decoder.entities()
+
+    def close(self):
+        '''Disconnect from the server.'''
+        self._socket.close()
+        self.closed = True
@@ -0,0 +1,16 @@
+"""
+File: asteriod_numpy.py
+This module implements the optional NumPy import of the asteroids game.
+numpy is imported once, here, when the game starts. Without it the
+engine still runs on plain objects, and only the parts of the game built
+on arrays refuse to be built.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def require_numpy(user):
+    '''Raise an ImportError naming the part of the game that needs numpy, if it is missing.'''
+    if np is None:
+        raise ImportError("%s needs numpy to be installed." % user)
@@ -0,0 +1,124 @@
+"""
+File: asteriod_particles.py
+This module implements the particle effects of the asteroids game.
+Particles are not game objects: they live in preallocated ring-buffer
+arrays of position, velocity, life and colour, move in one vectorized
+step a tick and are drawn in one batched call. When the ring is full the
+oldest particles are recycled. The engine reports asteriod splits and
+ship thrust to the system, which emits the explosions and the exhaust.
+"""
+import math
+import time
+
+from asteriod_engine import Rock_Size, SHIP_RADIUS
+from asteriod_numpy import np, require_numpy
+
+# Most particles alive at once; when full, new particles replace the oldest.
+PARTICLE_CAP = 4096
+
+# Particles flung out when an asteriod of each size splits, and how long they last in base ticks.
+EXPLOSION_PARTICLES = {Rock_Size.LARGE: 48, Rock_Size.MEDIUM: 24, Rock_Size.SMALL: 12}
+EXPLOSION_SPEED = 3.0
+EXPLOSION_LIFE = 40
+EXPLOSION_COLOR = (255, 170, 60, 255)
+
+# Particles blown out behind the ship on every tick of thrust, within EXHAUST_SPREAD degrees.
+EXHAUST_PARTICLES = 3
+EXHAUST_SPEED = 4.0
+EXHAUST_SPREAD = 15
+EXHAUST_LIFE = 15
+EXHAUST_COLOR = (120, 190, 255, 255)
+
+class Particle_System():
+    """
+    This class keeps every particle in a fixed set of arrays used as a
+    ring: new particles are written at the head, over whatever was there.
+    Positions and colours are float32 and uint8 so they can be handed to
+    the GPU as they are.
+    """
+
+    def __init__(self, width, height, capacity=PARTICLE_CAP, seed=None):
+        '''Intialize an empty ring of capacity particles over a width x height field.'''
+        require_numpy("The particle system")
+        self.width = width
+        self.height = height
+        self.capacity = capacity
+        self._size = np.array([width, height], dtype=np.float32)
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.max_life = np.ones(capacity, dtype=np.float32)
+        self.color = np.zeros((capacity, 4), dtype=np.uint8)
+
+        # Particles only decorate the game, so they draw from their own generator.
+        self._rng = np.random.default_rng(seed)
+        self._head = 0
+        self.emitted = 0
+        self.recycled = 0
+        self.step_time = 0.0
+
+    def emit(self, x, y, count, dx, dy, speed, life, color, heading=None, spread=180):
+        """
+        Start count particles at a point, overwriting the oldest ones when the ring is full.
+        :param x: x of the point
+        :param y: y of the point
+        :param count: how many particles
+        :param dx: x velocity every particle inherits from its source
+        :param dy: y velocity every particle inherits from its source
+        :param speed: top speed of a particle away from the point
+        :param life: base ticks a particle lasts at most
+        :param color: RGBA colour, faded out over the life of the particle
+        :param heading: direction in degrees the particles fly in, or None for every direction
+        :param spread: degrees either side of the heading
+        """
+        count = min(count, self.capacity)
+        rows = (self._head + np.arange(count)) % self.capacity
+        self._head = (self._head + count) % self.capacity
+        self.recycled += int(np.count_nonzero(self.life[rows] > 0))
+        self.emitted += count
+
+        angles = self._rng.uniform(-spread, spread, count)
+        if heading is not None:
+            angles += heading
+        angles = np.radians(angles)
+        speeds = self._rng.uniform(0.2, 1.0, count) * speed
+        self.pos[rows] = (x, y)
+        self.vel[rows, 0] = dx + np.cos(angles) * speeds
+        self.vel[rows, 1] = dy + np.sin(angles) * speeds
+        lives = self._rng.uniform(0.5, 1.0, count) * life
+        self.life[rows] = lives
+        self.max_life[rows] = lives
+        self.color[rows] = color
+
+    def split(self, asteriod):
+        '''Emit the explosion of an asteriod that was just hit.'''
+        self.emit(asteriod.center.get_x(), asteriod.center.get_y(), EXPLOSION_PARTICLES[asteriod.size],
+                  asteriod.velocity.get_dx(), asteriod.velocity.get_dy(), EXPLOSION_SPEED,
+                  EXPLOSION_LIFE, EXPLOSION_COLOR)
+
+    def thrust(self, ship, ddx, ddy):
+        '''Emit exhaust from a ship accelerating by (ddx, ddy), blown the opposite way.'''
+        heading = math.atan2(-ddy, -ddx)
+        offset = SHIP_RADIUS / 2
+        self.emit(ship.center.get_x() + math.cos(heading) * offset, ship.center.get_y() + math.sin(heading) * offset,
+                  EXHAUST_PARTICLES, ship.velocity.get_dx(), ship.velocity.get_dy(), EXHAUST_SPEED,
+                  EXHAUST_LIFE, EXHAUST_COLOR, math.degrees(heading), EXHAUST_SPREAD)
+
+    def step(self, scale=1.0):
+        '''Move, wrap, age and fade every particle by scale base ticks.'''
+        start = time.perf_counter()
+        self.pos += self.vel * scale
+        np.mod(self.pos, self._size, out=self.pos)
+        self.life -= scale
+        np.maximum(self.life, 0, out=self.life)
+        self.color[:, 3] = (255 * self.life / self.max_life).astype(np.uint8)
+        self.step_time = time.perf_counter() - start
+
+    def live(self):
+        '''Return the rows of the particles still alive.'''
+        return np.flatnonzero(self.life > 0)
+
+    def stats(self):
+        '''Return the live particles, the totals emitted and recycled, and the last step time.'''
+        return {"particles": int(np.count_nonzero(self.life > 0)), "capacity": self.capacity,
+                "emitted": self.emitted, "recycled": self.recycled, "step_time": self.step_time}
@@ -0,0 +1,45 @@
+"""
+File: asteriod_pool.py
+This module implements fixed-capacity object pools for the asteroids game,
+so that firing and splitting reuse objects instead of building new ones.
+"""
+
+class Pool():
+    def __init__(self, factory, capacity):
+        '''Intialize a pool and build all of its objects up front.'''
+        self._factory = factory
+        self.capacity = capacity
+        self._free = [factory() for _ in range(capacity)]
+        self._in_use = set()
+        self.high_water = 0
+        self.overflows = 0
+
+    def acquire(self):
+        '''Return a free object, reset in place and ready to use.'''
+        if self._free:
+            obj = self._free.pop()
+            obj.reset()
+        else:
+            # The pool is too small for this wave: build one more and remember it.
+            obj = self._factory()
+            self.overflows += 1
+
+        self._in_use.add(id(obj))
+        self.high_water = max(self.high_water, len(self._in_use))
+        return obj
+
+    def release(self, obj):
+        '''Give an object back to the pool.'''
+        if id(obj) not in self._in_use:
+            return
+        self._in_use.discard(id(obj))
+        self._free.append(obj)
+
+    def in_use(self):
+        '''Return how many objects are currently handed out.'''
+        return len(self._in_use)
+
+    def stats(self):
+        '''Return the usage numbers needed to size the pool.'''
+        return {"capacity": self.capacity, "in_use": len(self._in_use),
+                "high_water": self.high_water, "overflows": self.overflows}
@@ -0,0 +1,174 @@
+"""
+File: asteriod_profiler.py
+This module implements frame profiling for the asteroids game.
+Phase methods of the engine are timed by wrapping them on the engine
+instance only while profiling is on, so a game that is not being
+profiled runs exactly the same code as before.
+"""
+import collections
+import json
+import sys
+import time
+
+# The parts of Engine.step timed on their own, in the order they run.
+PHASES = ("advance", "check_keys", "check_off_screen", "cleanup_zombies", "check_collisions")
+
+# Frames kept for the rolling p50/p99 of the overlay.
+ROLLING_FRAMES = 120
+
+# Frames kept for the trace export, ten minutes at 60 frames a second.
+TRACE_FRAMES = 60 * 60 * 10
+
+def percentile(values, fraction):
+    '''Return the value below which the given fraction of the values fall.'''
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+class Phase_Timer():
+    def __init__(self, engine, phases=PHASES, spans=False):
+        '''Wrap the phase methods of an engine so each call is timed.'''
+        self._engine = engine
+        self._phases = phases
+        self._spans = [] if spans else None
+        self.samples = {phase: [] for phase in phases}
+        self.current = {phase: 0.0 for phase in phases}
+        self._stack = []
+        for phase in phases:
+            setattr(engine, phase, self._wrap(phase, getattr(engine, phase)))
+
+    def _wrap(self, phase, method):
+        '''Return a timed version of a phase method.'''
+        def timed(*args):
+            # Time spent in a phase called from another phase only counts once.
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            result = method(*args)
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            self.current[phase] += elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+            if self._spans is not None:
+                self._spans.append((phase, start, elapsed))
+            return result
+        return timed
+
+    def detach(self):
+        '''Put the plain phase methods back on the engine.'''
+        for phase in self._phases:
+            self._engine.__dict__.pop(phase, None)
+
+    def take_spans(self):
+        '''Return and forget every (phase, start, duration) call recorded so far.'''
+        spans, self._spans = self._spans, []
+        return spans
+
+    def end_tick(self):
+        '''Store the time of every phase for the tick that just ended.'''
+        for phase, elapsed in self.current.items():
+            self.samples[phase].append(elapsed)
+            self.current[phase] = 0.0
+
+class Frame_Profiler():
+    def __init__(self, engine, rolling_frames=ROLLING_FRAMES, trace_frames=TRACE_FRAMES):
+        '''Intialize a profiler and start timing the phases of engine.'''
+        self._engine = engine
+        self._timer = Phase_Timer(engine, PHASES, spans=True)
+        self._rolling = {phase: collections.deque(maxlen=rolling_frames)
+                         for phase in PHASES + ("on_draw", "frame")}
+        self.records = collections.deque(maxlen=trace_frames)
+        self._origin = time.perf_counter()
+        self._frame_start = None
+        self._blocks = 0
+        self._overflows = 0
+        self.frames = 0
+
+    def close(self):
+        '''Stop timing the engine.'''
+        self._timer.detach()
+
+    def _pool_overflows(self):
+        '''Return how many objects the pools of the engine had to build so far.'''
+        engine = self._engine
+        return sum(pool.overflows for pool in (engine.bullet_pool, engine.large_asteriod_pool,
+                                               engine.medium_asteriod_pool, engine.small_asteriod_pool))
+
+    def begin_frame(self):
+        '''Mark the start of a frame, before the update.'''
+        if self._frame_start is not None:
+            return
+        self._frame_start = time.perf_counter()
+        self._blocks = sys.getallocatedblocks()
+        self._overflows = self._pool_overflows()
+
+    def end_frame(self, draw_start, draw_time):
+        '''Store the record of a frame once it is drawn.'''
+        if self._frame_start is None:
+            self.begin_frame()
+        engine = self._engine
+        end = draw_start + draw_time
+        phases = dict(self._timer.current)
+        phases["on_draw"] = draw_time
+        phases["frame"] = end - self._frame_start
+        for phase, elapsed in phases.items():
+            self._rolling[phase].append(elapsed)
+
+        spans = self._timer.take_spans()
+        spans.append(("on_draw", draw_start, draw_time))
+        self.records.append({
+            "frame": self.frames,
+            "start": self._frame_start - self._origin,
+            "phases": phases,
+            "spans": [(phase, start - self._origin, elapsed) for phase, start, elapsed in spans],
+            "bullets": len(engine.bullets),
+            "large_asteriods": engine.large_asteriod_pool.in_use(),
+            "medium_asteriods": engine.medium_asteriod_pool.in_use(),
+            "small_asteriods": engine.small_asteriod_pool.in_use(),
+            "allocated_blocks": sys.getallocatedblocks() - self._blocks,
+            "pool_allocations": self._pool_overflows() - self._overflows})
+
+        for phase in self._timer.current:
+            self._timer.current[phase] = 0.0
+        self._frame_start = None
+        self.frames += 1
+
+    def summary(self):
+        '''Return the rolling p50 and p99 of every phase, in seconds.'''
+        return {phase: (percentile(samples, 0.50), percentile(samples, 0.99))
+                for phase, samples in self._rolling.items()}
+
+    def hud_lines(self):
+        '''Return the lines of text shown by the overlay.'''
+        lines = ["%-17s %7s %7s" % ("phase (ms)", "p50", "p99")]
+        for phase, (p50, p99) in self.summary().items():
+            lines.append("%-17s %7.3f %7.3f" % (phase, p50 * 1e3, p99 * 1e3))
+        if self.records:
+            last = self.records[-1]
+            lines.append("bullets %d  rocks %d/%d/%d" % (last["bullets"], last["large_asteriods"],
+                                                         last["medium_asteriods"], last["small_asteriods"]))
+            lines.append("allocated blocks %+d  pool allocations %d" % (last["allocated_blocks"],
+                                                                       last["pool_allocations"]))
+        return lines
+
+    def export_trace(self, path):
+        '''Write the frame records as a Chrome trace / Perfetto JSON file.'''
+        events = []
+        for record in self.records:
+            events.append({"name": "frame %d" % record["frame"], "ph": "X", "pid": 1, "tid": 1,
+                           "ts": record["start"] * 1e6, "dur": record["phases"]["frame"] * 1e6})
+            for phase, start, elapsed in record["spans"]:
+                events.append({"name": phase, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": start * 1e6, "dur": elapsed * 1e6})
+            events.append({"name": "entities", "ph": "C", "pid": 1, "ts": record["start"] * 1e6,
+                           "args": {"bullets": record["bullets"],
+                                    "large": record["large_asteriods"],
+                                    "medium": record["medium_asteriods"],
+                                    "small": record["small_asteriods"]}})
+            events.append({"name": "allocations", "ph": "C", "pid": 1, "ts": record["start"] * 1e6,
+                           "args": {"blocks": record["allocated_blocks"],
+                                    "pool": record["pool_allocations"]}})
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
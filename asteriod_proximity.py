@@ -0,0 +1,195 @@
+"""
+File: asteriod_proximity.py
+This module implements a proximity index over the asteriods of a game,
+for bots, autopilots and assisted aim. The centers are sorted into grid
+cells once a tick, and nearest-k, within-radius and first-along-a-heading
+queries only look at the cells they need, the shortest way around the
+edges. Every query takes many points at once and answers with indices
+into the asteriods list of the engine instead of objects.
+"""
+import math
+
+from asteriod_motion import directions
+from asteriod_numpy import np, require_numpy
+
+# Width and height of a cell of the index.
+PROXIMITY_CELL_SIZE = 64
+
+class Proximity_Index():
+    """
+    This class keeps the asteriod centers sorted by grid cell: cell c holds
+    the asteriods order[starts[c]:starts[c + 1]]. The field wraps, so every
+    distance is measured the shortest way around, and a query never reaches
+    further than half the field.
+    """
+
+    def __init__(self, width, height, cell_size=PROXIMITY_CELL_SIZE):
+        '''Intialize an empty index over a width x height field.'''
+        require_numpy("The proximity index")
+        self.width = width
+        self.height = height
+        self._cols = max(1, int(width // cell_size))
+        self._rows = max(1, int(height // cell_size))
+        self._cell_width = width / self._cols
+        self._cell_height = height / self._rows
+        self._size = np.array([width, height], dtype=np.float64)
+        self.tick = None
+        self.rebuild(np.zeros((0, 2)))
+
+    def update(self, engine):
+        '''Rebuild the index from the asteriods of an engine, once a tick.'''
+        if engine.ticks == self.tick and len(engine.asteriods) == len(self.pos):
+            return
+        asteriods = engine.asteriods
+        if engine.world is not None:
+            rows = np.fromiter((asteriod._row for asteriod in asteriods), dtype=np.intp, count=len(asteriods))
+            positions = engine.world.pos[rows]
+        else:
+            positions = np.fromiter((value for asteriod in asteriods
+                                     for value in (asteriod.center.get_x(), asteriod.center.get_y())),
+                                    dtype=np.float64, count=2 * len(asteriods)).reshape(-1, 2)
+        radii = np.fromiter((asteriod.radius for asteriod in asteriods), dtype=np.float64, count=len(asteriods))
+        self.rebuild(positions, radii)
+        self.tick = engine.ticks
+
+    def rebuild(self, positions, radii=None):
+        """
+        Sort a set of centers into the cells of the index.
+        :param positions: (N, 2) array of centers
+        :param radii: N radii, or None for points
+        """
+        self.pos = np.mod(np.asarray(positions, dtype=np.float64).reshape(-1, 2), self._size)
+        self.radius = np.zeros(len(self.pos)) if radii is None else np.asarray(radii, dtype=np.float64)
+        cells = self._cells_of(self.pos)
+        self.order = np.argsort(cells, kind="stable")
+        self.starts = np.searchsorted(cells[self.order], np.arange(self._cols * self._rows + 1))
+
+    def _cells_of(self, positions):
+        '''Return the cell of every position.'''
+        columns = (positions[:, 0] // self._cell_width).astype(np.intp) % self._cols
+        rows = (positions[:, 1] // self._cell_height).astype(np.intp) % self._rows
+        return rows * self._cols + columns
+
+    def _candidates(self, x, y, reach_x, reach_y=None):
+        '''Return the asteriods in every cell within reach of a point, and their offsets from it.'''
+        reach_y = reach_x if reach_y is None else reach_y
+        column = int(x // self._cell_width)
+        row = int(y // self._cell_height)
+        span_x = int(math.ceil(reach_x / self._cell_width))
+        span_y = int(math.ceil(reach_y / self._cell_height))
+        columns = np.arange(column - span_x, column + span_x + 1) % self._cols
+        rows = np.arange(row - span_y, row + span_y + 1) % self._rows
+
+        # A reach wider than the field wraps onto the same cells; only then are they deduplicated.
+        if len(columns) > self._cols:
+            columns = np.arange(self._cols)
+        if len(rows) > self._rows:
+            rows = np.arange(self._rows)
+        cells = (rows[:, None] * self._cols + columns[None, :]).ravel()
+
+        # Concatenate the slices of order for every cell without a Python loop.
+        firsts = self.starts[cells]
+        counts = self.starts[cells + 1] - firsts
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.intp), np.zeros((0, 2))
+        shifts = np.repeat(firsts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        found = self.order[shifts + np.arange(total)]
+        offsets = self.pos[found] - (x, y)
+        offsets += self._size / 2
+        np.mod(offsets, self._size, out=offsets)
+        offsets -= self._size / 2
+        return found, offsets
+
+    def within(self, points, radius):
+        """
+        Return the asteriods within a distance of each point.
+        :param points: (Q, 2) array of points, or one (x, y)
+        :param radius: the distance, counted to the edge of each asteriod
+        :return: a list of Q index arrays, nearest asteriod first
+        """
+        results = []
+        for x, y in np.asarray(points, dtype=np.float64).reshape(-1, 2):
+            reach = radius + (self.radius.max() if len(self.radius) else 0.0)
+            found, offsets = self._candidates(x, y, reach)
+            distances = np.hypot(offsets[:, 0], offsets[:, 1]) - self.radius[found]
+            keep = distances <= radius
+            found = found[keep]
+            results.append(found[np.argsort(distances[keep], kind="stable")])
+        return results
+
+    def nearest(self, points, k):
+        """
+        Return the k asteriods nearest to each point, counted to their edges.
+        :param points: (Q, 2) array of points, or one (x, y)
+        :param k: how many asteriods per point
+        :return: (Q, k) indices and (Q, k) distances, nearest first, padded with -1 and inf
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        indices = np.full((len(points), k), -1, dtype=np.intp)
+        distances = np.full((len(points), k), np.inf)
+        count = min(k, len(self.pos))
+        if count == 0:
+            return indices, distances
+
+        # Past half the field every asteriod is in reach.
+        largest = self.radius.max()
+        whole = max(self.width, self.height) / 2 + largest
+        start = max(self._cell_width, self._cell_height)
+        for query, (x, y) in enumerate(points):
+            reach = start
+            while True:
+                found, offsets = self._candidates(x, y, reach + largest)
+                near = np.hypot(offsets[:, 0], offsets[:, 1]) - self.radius[found]
+
+                # Anything outside the cells searched is further than reach.
+                sure = near <= reach
+                if np.count_nonzero(sure) >= count or reach >= whole:
+                    break
+                reach *= 2
+            best = np.argsort(near, kind="stable")[:count]
+            indices[query, :count] = found[best]
+            distances[query, :count] = near[best]
+        return indices, distances
+
+    def raycast(self, points, angles, max_range, thickness=0.0):
+        """
+        Return the first asteriod along a heading from each point.
+        :param points: (Q, 2) array of ray origins, or one (x, y)
+        :param angles: Q headings in degrees, or one heading
+        :param max_range: how far each ray looks, at most half the field
+        :param thickness: radius of whatever travels along the ray, such as a bullet
+        :return: Q indices and Q distances to the first touch, -1 and inf where nothing is hit
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        headings = directions(np.broadcast_to(np.asarray(angles, dtype=np.float64), (len(points),)))
+        max_range = min(max_range, min(self.width, self.height) / 2)
+        indices = np.full(len(points), -1, dtype=np.intp)
+        distances = np.full(len(points), np.inf)
+        if not len(self.pos):
+            return indices, distances
+
+        margin = thickness + self.radius.max()
+        for query, ((x, y), (dx, dy)) in enumerate(zip(points, headings)):
+            # Only the cells around the segment, from the middle of it.
+            half_x = abs(dx) * max_range / 2
+            half_y = abs(dy) * max_range / 2
+            found, offsets = self._candidates(x + dx * max_range / 2, y + dy * max_range / 2,
+                                              half_x + margin, half_y + margin)
+            if not len(found):
+                continue
+            offsets += (dx * max_range / 2, dy * max_range / 2)
+
+            # Closest approach of each center to the ray, then back to where the circles touch.
+            along = offsets[:, 0] * dx + offsets[:, 1] * dy
+            across = offsets[:, 0] * dy - offsets[:, 1] * dx
+            reach = self.radius[found] + thickness
+            touching = np.abs(across) <= reach
+            chord = np.sqrt(np.maximum(reach * reach - across * across, 0.0))
+            entry = np.maximum(along - chord, 0.0)
+            hits = touching & (along + chord >= 0) & (entry <= max_range)
+            if np.any(hits):
+                first = np.flatnonzero(hits)[np.argmin(entry[hits])]
+                indices[query] = found[first]
+                distances[query] = entry[first]
+        return indices, distances
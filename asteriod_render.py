@@ -0,0 +1,138 @@
+"""
+File: asteriod_render.py
+This module implements batched sprite rendering for the asteroids game.
+Every texture gets one persistent sprite list. Each frame the positions,
+angles and alpha of the live objects are pushed into the lists and each
+list is drawn with a single call, however many objects are on screen.
+Particles are drawn the same way, as one batch of coloured points.
+"""
+import time
+import arcade
+from arcade.gl import BufferDescription
+from asteriod_textures import TEXTURES
+
+# Width of a particle in pixels.
+PARTICLE_SIZE = 2
+
+class Sprite_Renderer():
+    def __init__(self, images):
+        '''Intialize one sprite list per image, drawn in the given order.'''
+        self._images = list(images)
+        self._lists = {}
+        self._textures = {}
+        for image in self._images:
+            self._lists[image] = arcade.SpriteList(use_spatial_hash=False)
+        self._groups = {image: [] for image in self._images}
+        self.draw_calls = 0
+        self.submit_time = 0.0
+        self.sprite_count = 0
+
+    def _resize(self, image, count):
+        '''Grow or shrink the sprite list of an image to count sprites.'''
+        sprites = self._lists[image]
+        if len(sprites) < count and image not in self._textures:
+            # Looked up on first use so the atlas can still be preloading while the window opens.
+            self._textures[image] = TEXTURES.get(image).texture
+        while len(sprites) < count:
+            sprite = arcade.Sprite()
+            sprite.texture = self._textures[image]
+            sprites.append(sprite)
+        while len(sprites) > count:
+            sprites.pop()
+        return sprites
+
+    def _push(self, image, objects, world, back, camera):
+        '''Copy position, angle and alpha of the objects into the sprites of an image.
+        Everything is drawn back base ticks along its velocity and spin, to interpolate
+        between the last two ticks, and moved into the view of the camera if there is one.'''
+        sprites = self._resize(image, len(objects))
+        if not objects:
+            return
+
+        if world is not None:
+            # Read the rows of the world in bulk instead of one view at a time.
+            rows = [obj._row for obj in objects]
+            positions = world.pos[rows] - world.vel[rows] * back
+            if camera is not None:
+                camera.to_screen_array(positions)
+            positions = positions.tolist()
+            angles = (world.angle[rows] - world.spin[rows] * back).tolist()
+            for sprite, obj, (x, y), angle in zip(sprites, objects, positions, angles):
+                sprite.center_x = x
+                sprite.center_y = y
+                sprite.angle = angle
+                sprite.alpha = obj._alpha
+        else:
+            for sprite, obj in zip(sprites, objects):
+                x = obj.center.get_x() - obj.velocity.get_dx() * back
+                y = obj.center.get_y() - obj.velocity.get_dy() * back
+                if camera is not None:
+                    x, y = camera.to_screen(x, y)
+                sprite.center_x = x
+                sprite.center_y = y
+                sprite.angle = obj._angle - obj._spin * back
+                sprite.alpha = obj._alpha
+
+    def draw(self, objects, world=None, back=0.0, camera=None):
+        '''Draw every live object with one draw call per image, through a camera if given.'''
+        start = time.perf_counter()
+
+        groups = self._groups
+        for group in groups.values():
+            group.clear()
+        for obj in objects:
+            groups[obj._img].append(obj)
+
+        self.draw_calls = 0
+        self.sprite_count = 0
+        for image in self._images:
+            self._push(image, groups[image], world, back, camera)
+            if groups[image]:
+                self._lists[image].draw()
+                self.draw_calls += 1
+                self.sprite_count += len(groups[image])
+
+        self.submit_time = time.perf_counter() - start
+
+    def stats(self):
+        '''Return the draw calls, sprites and submit time of the last frame.'''
+        return {"draw_calls": self.draw_calls, "sprites": self.sprite_count,
+                "submit_time": self.submit_time}
+
+class Particle_Renderer():
+    """
+    This class draws the live particles of a particle system with one draw
+    call. Their positions and colours are copied straight from the arrays
+    of the system into two GPU buffers sized for the whole ring.
+    """
+
+    def __init__(self, particles):
+        '''Intialize the GPU buffers for every particle a system can hold.'''
+        self._particles = particles
+        self._ctx = arcade.get_window().ctx
+        self._positions = self._ctx.buffer(reserve=particles.capacity * 8, usage="stream")
+        self._colors = self._ctx.buffer(reserve=particles.capacity * 4, usage="stream")
+        self._geometry = self._ctx.geometry([
+            BufferDescription(self._positions, "2f", ["in_vert"]),
+            BufferDescription(self._colors, "4f1", ["in_color"], normalized=["in_color"])])
+        self.draw_time = 0.0
+        self.count = 0
+
+    def draw(self, camera=None, particles=None):
+        '''Draw every live particle, through a camera if given, or a copy of them taken on another thread.'''
+        start = time.perf_counter()
+        if particles is None:
+            particles = self._particles
+        rows = particles.live()
+        self.count = len(rows)
+        if self.count:
+            positions = particles.pos[rows]
+            if camera is not None:
+                camera.to_screen_array(positions)
+            self._positions.write(positions.tobytes())
+            self._colors.write(particles.color[rows].tobytes())
+            self._ctx.point_size = PARTICLE_SIZE
+            self._geometry.render(self._ctx.line_generic_with_colors_program, mode=self._ctx.POINTS,
+                                  vertices=self.count)
+            self._ctx.point_size = 1
+        self.draw_time = time.perf_counter() - start
@@ -0,0 +1,273 @@
+"""
+File: asteriod_replay.py
+This module records the inputs of an asteroids game and replays them.
+A recording is the seed of the game followed by the actions of every
+tick, run-length encoded so a tick that repeats the one before it costs
+nothing. State hashes are written at checkpoints, and a replay runs
+headless as fast as the CPU allows and reports any tick where the game
+no longer ends up in the recorded state.
+
+Examples:
+    python asteriod_game.py --record session.rec
+    python asteriod_replay.py session.rec
+    python asteriod_replay.py session.rec --seek 36000
+    python asteriod_replay.py session.rec --check-snapshot 1800
+    python asteriod_replay.py session.rec --other-mode
+"""
+import argparse
+import bisect
+import hashlib
+import struct
+import sys
+import time
+from array import array
+
+from asteriod_engine import Engine, BASE_TICK_RATE, TURN_LEFT, TURN_RIGHT, THRUST, REVERSE, FIRE
+from asteriod_snapshot import Snapshot_Format, SNAPSHOT_BULLETS, SNAPSHOT_ROCKS, save, load
+
+MAGIC = b"ASTR"
+
+# Bumped whenever a seed starts a different game, so an old recording is refused, not misplayed.
+VERSION = 2
+
+# magic, version, seed, tick rate, width, height, NumPy world, checkpoint interval
+HEADER = struct.Struct("<4sHqHHH?I")
+
+# A run of identical ticks: tag, ticks, held actions mask, shots per tick.
+RUN = struct.Struct("<BHBB")
+RUN_TAG = 1
+
+# The state hash after a tick: tag, tick, hash.
+CHECKPOINT = struct.Struct("<BIQ")
+CHECKPOINT_TAG = 2
+
+# The longest run a single record can hold.
+MAX_RUN = 0xFFFF
+
+# Ticks between two state hashes, ten seconds at the base tick rate.
+CHECKPOINT_INTERVAL = BASE_TICK_RATE * 10
+
+# One bit of the held actions mask for every held action.
+ACTION_BITS = {TURN_LEFT: 1, TURN_RIGHT: 2, THRUST: 4, REVERSE: 8}
+
+def encode_inputs(inputs):
+    '''Return the held actions mask and the number of shots of one tick of inputs.'''
+    mask = 0
+    shots = 0
+    for action in inputs:
+        if action == FIRE:
+            shots += 1
+        else:
+            mask |= ACTION_BITS.get(action, 0)
+    return mask, shots
+
+def decode_inputs(mask, shots):
+    '''Return the inputs of one tick from its held actions mask and number of shots.'''
+    inputs = [action for action, bit in ACTION_BITS.items() if mask & bit]
+    return inputs + [FIRE] * shots
+
+def state_hash(engine):
+    '''Return a 64-bit hash of everything the game rules read.'''
+    values = array("d", (engine.ticks, engine.new_angle, len(engine.bullets), len(engine.asteriods)))
+    for obj in [engine.ship] + engine.bullets + engine.asteriods:
+        values.extend((obj.center.get_x(), obj.center.get_y(), obj.velocity.get_dx(),
+                       obj.velocity.get_dy(), obj._angle, obj.alive))
+    for bullet in engine.bullets:
+        values.append(bullet._life)
+    return int.from_bytes(hashlib.blake2b(values.tobytes(), digest_size=8).digest(), "little")
+
+class Input_Recorder():
+    def __init__(self, engine, path, checkpoint_interval=CHECKPOINT_INTERVAL):
+        '''Start recording every step of engine to the file at path.'''
+        if engine.seed is None:
+            raise ValueError("only a game built with a seed can be replayed")
+        self._engine = engine
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, engine.seed, engine.tick_rate, engine.width,
+                                     engine.height, engine.world is not None, checkpoint_interval))
+        self.checkpoint_interval = checkpoint_interval
+        self._run = None
+        self._count = 0
+        self.ticks = 0
+        engine.step = self._wrap(engine.step)
+
+    def _wrap(self, step):
+        '''Return a version of Engine.step that records its inputs.'''
+        def recorded(inputs=()):
+            self.record(encode_inputs(inputs))
+            step(inputs)
+            if self.ticks % self.checkpoint_interval == 0:
+                self._flush()
+                self._file.write(CHECKPOINT.pack(CHECKPOINT_TAG, self.ticks, state_hash(self._engine)))
+        return recorded
+
+    def record(self, encoded):
+        '''Add the encoded (mask, shots) of one tick to the current run.'''
+        if encoded != self._run or self._count == MAX_RUN:
+            self._flush()
+            self._run = encoded
+        self._count += 1
+        self.ticks += 1
+
+    def _flush(self):
+        '''Write the current run.'''
+        if self._count:
+            self._file.write(RUN.pack(RUN_TAG, self._count, *self._run))
+        self._count = 0
+
+    def close(self):
+        '''Write what is left and stop recording.'''
+        if self._file.closed:
+            return
+        self._flush()
+        self._file.close()
+        self._engine.__dict__.pop("step", None)
+
+class Replayer():
+    """
+    This class plays a recording back on a headless engine. Ticks are
+    stepped straight from the decoded runs, and every checkpoint passed
+    is checked against the recorded state hash.
+    """
+
+    def __init__(self, path, other_mode=False):
+        '''Read a recording and build the engine at its first tick, in the other mode than recorded if asked.'''
+        with open(path, "rb") as recording:
+            data = recording.read()
+        (magic, version, self.seed, self.tick_rate, self.width, self.height,
+         self.use_world, self.checkpoint_interval) = HEADER.unpack_from(data)
+        if other_mode:
+            self.use_world = not self.use_world
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d asteroids recording" % (path, VERSION))
+
+        # Runs as parallel lists so a tick is found with a binary search.
+        self._starts = []
+        self._runs = []
+        self.checkpoints = {}
+        self.length = 0
+        offset = HEADER.size
+        while offset < len(data):
+            if data[offset] == RUN_TAG:
+                _, count, mask, shots = RUN.unpack_from(data, offset)
+                self._starts.append(self.length)
+                self._runs.append((count, decode_inputs(mask, shots)))
+                self.length += count
+                offset += RUN.size
+            else:
+                _, tick, expected = CHECKPOINT.unpack_from(data, offset)
+                self.checkpoints[tick] = expected
+                offset += CHECKPOINT.size
+
+        self.divergences = []
+        self.restart()
+
+    def restart(self):
+        '''Build a fresh engine at tick 0.'''
+        self.engine = Engine(self.width, self.height, self.seed, self.use_world, self.tick_rate)
+        self.tick = 0
+
+    def seek(self, tick, verify=True):
+        """
+        Run the recording up to a tick.
+        :param tick: the tick to stop at, from 0 to the length of the recording
+        :param verify: check the state hash at every checkpoint passed
+        :return: the engine at that tick
+        """
+        tick = max(0, min(tick, self.length))
+        if tick < self.tick:
+            self.restart()
+
+        engine = self.engine
+        step = engine.step
+        checkpoints = self.checkpoints if verify else {}
+        index = bisect.bisect_right(self._starts, self.tick) - 1
+        while self.tick < tick:
+            count, inputs = self._runs[index]
+            end = min(self._starts[index] + count, tick)
+            while self.tick < end:
+                step(inputs)
+                self.tick += 1
+                if self.tick in checkpoints:
+                    actual = state_hash(engine)
+                    if actual != checkpoints[self.tick]:
+                        self.divergences.append((self.tick, checkpoints[self.tick], actual))
+            index += 1
+        return engine
+
+    def run(self, verify=True):
+        '''Run the recording to its end and return the ticks where the state diverged.'''
+        self.seek(self.length, verify)
+        return self.divergences
+
+    def check_snapshot(self, tick):
+        """
+        Save the game at a tick, load the save into a new engine and play the rest of the recording on both.
+        :param tick: the tick to save at
+        :return: the first tick where the loaded game differs from the replayed one, or None
+        """
+        engine = self.seek(tick, verify=False)
+
+        # Slots for everything in play and staged, so any game of the recording can be saved.
+        staged = len(engine.waves.staged) if engine.waves is not None else 0
+        snapshot_format = Snapshot_Format(max(SNAPSHOT_BULLETS, len(engine.bullets)),
+                                          max(SNAPSHOT_ROCKS, len(engine.asteriods) + staged))
+        loaded = Engine(self.width, self.height, self.seed, self.use_world, self.tick_rate)
+        load(loaded, save(engine, snapshot_format), snapshot_format)
+
+        index = bisect.bisect_right(self._starts, self.tick) - 1
+        while self.tick < self.length:
+            count, inputs = self._runs[index]
+            while self.tick < self._starts[index] + count:
+                engine.step(inputs)
+                loaded.step(inputs)
+                self.tick += 1
+                if state_hash(engine) != state_hash(loaded):
+                    return self.tick
+            index += 1
+        return None
+
+def main(argv=None):
+    '''Parse the command line and replay a recording.'''
+    parser = argparse.ArgumentParser(description="Replay a recorded asteroids game headless.")
+    parser.add_argument("recording")
+    parser.add_argument("--seek", type=int, help="stop at this tick instead of the end")
+    parser.add_argument("--no-verify", action="store_true", help="skip the state hash checks")
+    parser.add_argument("--check-snapshot", type=int, metavar="TICK",
+                        help="save and load the game at this tick and check the rest plays the same")
+    parser.add_argument("--other-mode", action="store_true",
+                        help="replay on plain objects if recorded in the NumPy world, and the other way around")
+    args = parser.parse_args(argv)
+
+    replayer = Replayer(args.recording, args.other_mode)
+    if args.check_snapshot is not None:
+        tick = min(max(0, args.check_snapshot), replayer.length)
+        spawner = replayer.seek(tick, verify=False).waves
+        first_wave = spawner.wave if spawner is not None else 0
+        diverged = replayer.check_snapshot(tick)
+        waves = (spawner.wave if spawner is not None else 0) - first_wave
+        if diverged is None:
+            print("snapshot of tick %d loaded and played to tick %d through %d wave(s) the same"
+                  % (tick, replayer.tick, waves))
+            return 0
+        print("snapshot of tick %d loaded, diverged at tick %d" % (tick, diverged))
+        return 1
+    target = replayer.length if args.seek is None else args.seek
+    start = time.perf_counter()
+    engine = replayer.seek(target, not args.no_verify)
+    elapsed = time.perf_counter() - start
+
+    print("%d ticks (%.1f s of play) replayed in %.3f s, %.0f ticks/s"
+          % (replayer.tick, replayer.tick / replayer.tick_rate, elapsed, replayer.tick / elapsed if elapsed else 0.0))
+    print("ship %s at (%.1f, %.1f), %d bullets, %d asteriods"
+          % ("alive" if engine.ship.alive else "dead", engine.ship.center.get_x(),
+             engine.ship.center.get_y(), len(engine.bullets), len(engine.asteriods)))
+    for tick, expected, actual in replayer.divergences:
+        print("tick %d: state hash %016x, recorded %016x" % (tick, actual, expected))
+    if args.no_verify:
+        return 0
+    print("%d checkpoint(s) diverged" % len(replayer.divergences))
+    return 1 if replayer.divergences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""
+File: asteriod_server.py
+This program runs the authoritative multiplayer asteroids server, a
+load generator for it, and a thin client window.
+The server steps one shared field at a fixed rate with a ship for every
+connected player. Each tick's state is packed once; clients that
+acknowledged the same earlier state share one encoded delta.
+
+Examples:
+    python asteriod_server.py serve
+    python asteriod_server.py load --clients 200 --seconds 10
+    python asteriod_server.py play
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from asteriod_engine import Engine, Ship, Rock_Size, SCREEN_WIDTH, SCREEN_HEIGHT, BASE_TICK_RATE, FIRE
+from asteriod_net import (DEFAULT_HOST, DEFAULT_PORT, FRAME, WELCOME, INPUT, STATE, WELCOME_MESSAGE,
+                          INPUT_MESSAGE, STATE_HEADER, ENTITY, SHIP, BULLET, LARGE, MEDIUM, SMALL,
+                          POSITION_STEPS, ANGLE_STEPS, HISTORY_TICKS, frame, quantize, encode_delta,
+                          State_Decoder)
+from asteriod_profiler import percentile
+from asteriod_replay import ACTION_BITS, decode_inputs
+
+# A client whose socket already holds this many unsent bytes skips a tick.
+# Deltas are against acknowledged states, so it catches up with the next one.
+MAX_BUFFERED_BYTES = 64 * 1024
+
+# Most shots a player can fire in one tick.
+MAX_SHOTS_PER_TICK = 3
+
+# The entity kind sent for each size of asteriod.
+ROCK_KINDS = {Rock_Size.LARGE: LARGE, Rock_Size.MEDIUM: MEDIUM, Rock_Size.SMALL: SMALL}
+
+LOAD_SECONDS = 10
+LOAD_CLIENTS = 100
+
+# Chance a simulated player fires on a tick.
+LOAD_FIRE_CHANCE = 0.05
+
+class Arena(Engine):
+    """
+    This class is an engine with one ship per player. The field lives
+    in a NumPy world so every ship moves and wraps in the same step.
+    """
+
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, seed=None, tick_rate=BASE_TICK_RATE):
+        '''Intialize an empty arena with its asteriods.'''
+        super().__init__(width, height, seed, use_world=True, tick_rate=tick_rate)
+
+        # The single-player ship stays out of play; self.ship only points at a player's ship mid-step.
+        self.ship.alive = False
+        self._idle_ship = self.ship
+        self.ships = {}
+        self._angles = {}
+
+    def add_player(self, player):
+        '''Put a new ship in the field for a player and return it.'''
+        ship = Ship()
+        ship.set_vector((player * 97) % self.width, (player * 61) % self.height)
+        self.world.bind(ship)
+        self.ships[player] = ship
+        self._angles[player] = 0
+        return ship
+
+    def remove_player(self, player):
+        '''Take the ship of a player out of the field.'''
+        ship = self.ships.pop(player)
+        del self._angles[player]
+        self.world.unbind(ship)
+
+    def player_ships(self):
+        '''Return the ships of every player.'''
+        return self.ships.values()
+
+    def fire(self):
+        '''Fire a bullet from the ship of the current player.'''
+        self.bullets_fired += 1
+        bullet = self.acquire(self.bullet_pool)
+        self.bullets.append(bullet)
+        bullet.set_angle(self.ship.get_angle())
+        bullet.set_vector(self.ship.center.get_x(), self.ship.center.get_y())
+        bullet.fire(self.ship.get_angle())
+
+    def step(self, inputs=None):
+        """
+        Move the arena forward one tick.
+        :param inputs: {player: the actions held this tick, with FIRE once for every shot}
+        """
+        inputs = inputs or {}
+        held = {}
+        for player, ship in self.ships.items():
+            held[player] = set()
+            if not ship.alive:
+                continue
+            self.ship = ship
+            for action in inputs.get(player, ()):
+                if action == FIRE:
+                    self.fire()
+                else:
+                    held[player].add(action)
+
+        self.advance()
+
+        # Turning keeps a per-ship angle step, so each ship turns as the engine's own.
+        for player, ship in self.ships.items():
+            self.ship = ship
+            self.new_angle = self._angles[player]
+            self.check_keys(held[player])
+            self._angles[player] = self.new_angle
+
+        self.ship = self._idle_ship
+        self.end_tick()
+
+class Client():
+    def __init__(self, player, writer):
+        '''Intialize the server side of a connected player.'''
+        self.player = player
+        self.writer = writer
+        self.inputs = []
+        self.shots = 0
+        self.ack = 0
+        self.bytes_sent = 0
+
+class Server():
+    """
+    This class accepts players over TCP, steps the arena at a fixed rate
+    and broadcasts the state after every tick.
+    """
+
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, seed=None, tick_rate=BASE_TICK_RATE):
+        '''Intialize a server and its arena.'''
+        self.arena = Arena(width, height, seed, tick_rate)
+        self.tick_rate = tick_rate
+        self.clients = {}
+        self._next_player = 1
+        self._net_ids = {}
+        self._next_net_id = 1
+
+        # The packed states of the last ticks, by tick.
+        self._states = collections.OrderedDict()
+        self.tick_times = collections.deque(maxlen=tick_rate * 10)
+        self._tick_time = 0.0
+
+    def _net_id(self, obj):
+        '''Return the number an object is known by on the wire.'''
+        # Pooled objects are reused, not rebuilt, so the table stays as small as the pools.
+        net_id = self._net_ids.get(obj)
+        if net_id is None:
+            net_id = self._net_ids[obj] = self._next_net_id
+            self._next_net_id = (self._next_net_id + 1) % 0x10000 or 1
+        return net_id
+
+    def snapshot(self):
+        '''Return {net id: packed entity record} of every object in the arena.'''
+        arena = self.arena
+        width, height = arena.width, arena.height
+        records = {}
+        pack = ENTITY.pack
+        for kind, objects in ((SHIP, arena.ships.values()), (BULLET, arena.bullets)):
+            for obj in objects:
+                net_id = self._net_id(obj)
+                records[net_id] = pack(net_id, kind, quantize(obj.center.get_x(), width, POSITION_STEPS),
+                                       quantize(obj.center.get_y(), height, POSITION_STEPS),
+                                       quantize(obj._angle, 360, ANGLE_STEPS))
+        for asteriod in arena.asteriods:
+            net_id = self._net_id(asteriod)
+            records[net_id] = pack(net_id, ROCK_KINDS[asteriod.size], quantize(asteriod.center.get_x(), width, POSITION_STEPS),
+                                   quantize(asteriod.center.get_y(), height, POSITION_STEPS),
+                                   quantize(asteriod._angle, 360, ANGLE_STEPS))
+        return records
+
+    def tick(self):
+        '''Step the arena with the inputs received since the last tick and send the new state.'''
+        start = time.perf_counter()
+        inputs = {}
+        for client in self.clients.values():
+            inputs[client.player] = client.inputs + [FIRE] * min(client.shots, MAX_SHOTS_PER_TICK)
+            client.shots = 0
+        self.arena.step(inputs)
+
+        tick = self.arena.ticks
+        current = self.snapshot()
+        self._states[tick] = current
+        if len(self._states) > HISTORY_TICKS:
+            self._states.popitem(last=False)
+
+        # One encoding per acknowledged state, shared by every client that acknowledged it.
+        encoded = {}
+        now = time.monotonic()
+        for client in self.clients.values():
+            if client.writer.transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+                continue
+            base = client.ack if client.ack in self._states else 0
+            message = encoded.get(base)
+            if message is None:
+                changed, removed, changed_count, removed_count = encode_delta(current, self._states.get(base, {}))
+                header = STATE_HEADER.pack(tick, base, now, self._tick_time, changed_count, removed_count)
+                message = encoded[base] = frame(STATE, header + changed + removed)
+            client.writer.write(message)
+            client.bytes_sent += len(message)
+
+        self._tick_time = time.perf_counter() - start
+        self.tick_times.append(self._tick_time)
+
+    async def handle_client(self, reader, writer):
+        '''Serve one player until it disconnects.'''
+        player = self._next_player
+        self._next_player += 1
+        client = Client(player, writer)
+        ship = self.arena.add_player(player)
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        writer.write(frame(WELCOME, WELCOME_MESSAGE.pack(self._net_id(ship), self.arena.width,
+                                                         self.arena.height, self.tick_rate)))
+        self.clients[player] = client
+        try:
+            while True:
+                length, message_type = FRAME.unpack(await reader.readexactly(FRAME.size))
+                payload = await reader.readexactly(length)
+                if message_type == INPUT:
+                    client.ack, mask, shots = INPUT_MESSAGE.unpack(payload)
+                    client.inputs = decode_inputs(mask, 0)
+                    client.shots += shots
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.clients[player]
+            self.arena.remove_player(player)
+            # The ship is never reused, so its number would otherwise be kept forever.
+            self._net_ids.pop(ship, None)
+            writer.close()
+
+    async def run(self, host=DEFAULT_HOST, port=DEFAULT_PORT, seconds=None):
+        '''Accept players and tick at the tick rate, forever or for a number of seconds.'''
+        server = await asyncio.start_server(self.handle_client, host, port)
+        loop = asyncio.get_running_loop()
+        tick_time = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        end = None if seconds is None else next_tick + seconds
+        async with server:
+            while end is None or next_tick < end:
+                self.tick()
+                next_tick += tick_time
+                # Fall behind rather than burst when a tick overruns.
+                next_tick = max(next_tick, loop.time())
+                await asyncio.sleep(next_tick - loop.time())
+
+    def stats(self):
+        '''Return the player count, the tick time percentiles and the bytes sent.'''
+        return {"players": len(self.clients),
+                "tick_p50": percentile(self.tick_times, 0.50),
+                "tick_p99": percentile(self.tick_times, 0.99),
+                "bytes_sent": sum(client.bytes_sent for client in self.clients.values())}
+
+async def load_client(host, port, seconds, seed, results):
+    '''Play as a random player for a number of seconds and add what it measured to results.'''
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    length, message_type = FRAME.unpack(await reader.readexactly(FRAME.size))
+    player, width, height, tick_rate = WELCOME_MESSAGE.unpack(await reader.readexactly(length))
+    decoder = State_Decoder(width, height)
+    actions = list(ACTION_BITS.values())
+    mask = 0
+    received = states = 0
+    end = time.monotonic() + seconds
+    try:
+        while time.monotonic() < end:
+            length, message_type = FRAME.unpack(await reader.readexactly(FRAME.size))
+            payload = await reader.readexactly(length)
+            received += FRAME.size + length
+            if message_type != STATE:
+                continue
+            decoder.apply(payload)
+            states += 1
+            results["latency"].append(time.monotonic() - decoder.server_time)
+            results["tick_time"].append(decoder.tick_time)
+            if rng.random() < 0.05:
+                mask = rng.choice(actions) | rng.choice(actions)
+            shots = 1 if rng.random() < LOAD_FIRE_CHANCE else 0
+            writer.write(frame(INPUT, INPUT_MESSAGE.pack(decoder.tick, mask, shots)))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        # The server went away; report what was measured until then.
+        pass
+    finally:
+        writer.close()
+    results["bytes"].append(received)
+    results["states"].append(states)
+    results["entities"].append(len(decoder.entities()))
+
+async def run_load(host, port, clients, seconds, first_seed=0):
+    '''Run many load clients at once and return what they measured.'''
+    results = {"latency": [], "tick_time": [], "bytes": [], "states": [], "entities": []}
+    await asyncio.gather(*(load_client(host, port, seconds, seed, results)
+                           for seed in range(first_seed, first_seed + clients)))
+    return results
+
+def load_process(host, port, clients, seconds, first_seed):
+    '''Run a share of the load clients in a worker process.'''
+    return asyncio.run(run_load(host, port, clients, seconds, first_seed))
+
+def serve(args):
+    '''Run the server until interrupted.'''
+    server = Server(seed=args.seed, tick_rate=args.tick_rate)
+    print("Serving on %s:%d at %d ticks a second" % (args.host, args.port, args.tick_rate))
+    try:
+        asyncio.run(server.run(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def load(args):
+    '''Connect many simulated players and report bandwidth and latency.'''
+    # Decoding every state for hundreds of players is more than one process keeps up with,
+    # so the players are spread over worker processes that would otherwise be separate machines.
+    processes = max(1, min(args.processes, args.clients))
+    shares = [args.clients // processes + (index < args.clients % processes) for index in range(processes)]
+    results = {"latency": [], "tick_time": [], "bytes": [], "states": [], "entities": []}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(load_process, args.host, args.port, share, args.seconds, sum(shares[:index]))
+                   for index, share in enumerate(shares)]
+        for future in futures:
+            for name, values in future.result().items():
+                results[name].extend(values)
+    clients = len(results["bytes"])
+    print("%d clients, %d states, %.0f entities in view"
+          % (clients, sum(results["states"]), sum(results["entities"]) / max(clients, 1)))
+    print("%.1f kB/s per client, %.1f kB/s in total"
+          % (sum(results["bytes"]) / max(clients, 1) / args.seconds / 1e3, sum(results["bytes"]) / args.seconds / 1e3))
+    print("latency p50 %.2f ms p99 %.2f ms, server tick p50 %.3f ms p99 %.3f ms"
+          % (percentile(results["latency"], 0.50) * 1e3, percentile(results["latency"], 0.99) * 1e3,
+             percentile(results["tick_time"], 0.50) * 1e3, percentile(results["tick_time"], 0.99) * 1e3))
+    return 0
+
+def play(args):
+    '''Open a thin client window on a server.'''
+    import arcade
+    from asteriod_net import Net_Client
+    from asteriod_window import Remote_Game
+
+    Remote_Game(Net_Client(args.host, args.port))
+    arcade.run()
+    return 0
+
+def main(argv=None):
+    '''Parse the command line and serve, load or play.'''
+    parser = argparse.ArgumentParser(description="Multiplayer asteroids over TCP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the authoritative server")
+    serve_parser.add_argument("--seed", type=int)
+    serve_parser.add_argument("--tick-rate", type=int, default=BASE_TICK_RATE)
+    serve_parser.set_defaults(handler=serve)
+
+    load_parser = commands.add_parser("load", help="measure a server with simulated players")
+    load_parser.add_argument("--clients", type=int, default=LOAD_CLIENTS)
+    load_parser.add_argument("--seconds", type=float, default=LOAD_SECONDS)
+    load_parser.add_argument("--processes", type=int, default=os.cpu_count())
+    load_parser.set_defaults(handler=load)
+
+    play_parser = commands.add_parser("play", help="open a window on a server")
+    play_parser.set_defaults(handler=play)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+File: asteriod_sim_thread.py
+This module implements the simulation thread of the asteroids game.
+The engine is stepped on a thread of its own, on its own fixed-step
+clock, and after every batch of ticks it publishes a copy of what there
+is to draw into one of two buffers it reuses. The window only ever reads
+the latest published state, so a slow tick no longer holds up a frame.
+Keys reach the thread through a deque, which either side can use without
+a lock.
+"""
+import collections
+import threading
+import time
+
+from asteriod_camera import Camera
+from asteriod_clock import Fixed_Step_Clock
+from asteriod_engine import FIRE
+
+# Events the window queues for the simulation thread.
+KEY_DOWN = "key_down"
+KEY_UP = "key_up"
+
+# Longest the thread sleeps at once between ticks, so it notices being stopped.
+MAX_SLEEP = 0.005
+
+# Busy spans of the thread kept to measure how much of each frame overlapped with it.
+BUSY_SPANS = 256
+
+class Frozen_Object():
+    """
+    This class is a drawable copy of a flying object as it was on one
+    tick. It is its own center and velocity, so the renderer, the camera
+    and the frame budget read it like the object it copies.
+    """
+    __slots__ = ("center", "velocity", "_x", "_y", "_dx", "_dy", "_angle", "_spin", "_alpha", "_img", "size")
+
+    def __init__(self, obj=None):
+        '''Intialize a copy of the position, motion and look of an object, or an empty one to copy into.'''
+        self.center = self
+        self.velocity = self
+        if obj is not None:
+            self.copy(obj)
+
+    def copy(self, obj):
+        '''Take the position, motion and look of an object.'''
+        self._x = obj.center.get_x()
+        self._y = obj.center.get_y()
+        self._dx = obj.velocity.get_dx()
+        self._dy = obj.velocity.get_dy()
+        self._angle = obj._angle
+        self._spin = getattr(obj, "_spin", 0)
+        self._alpha = obj._alpha
+        self._img = obj._img
+        self.size = getattr(obj, "size", None)
+
+    def get_x(self):
+        '''Return x.'''
+        return self._x
+
+    def get_y(self):
+        '''Return y.'''
+        return self._y
+
+    def get_dx(self):
+        '''Return dx.'''
+        return self._dx
+
+    def get_dy(self):
+        '''Return dy.'''
+        return self._dy
+
+class Frozen_Particles():
+    '''A copy of the live particles of a particle system, drawn like the system itself.'''
+    __slots__ = ("pos", "color", "capacity", "count")
+
+    def __init__(self, particles):
+        '''Intialize room for a copy of every particle of a system.'''
+        self.pos = particles.pos.copy()
+        self.color = particles.color.copy()
+        self.capacity = particles.capacity
+        self.count = 0
+
+    def copy(self, particles):
+        '''Take the positions and colours of the live particles, packed at the front.'''
+        rows = particles.live()
+        count = len(rows)
+        particles.pos.take(rows, axis=0, out=self.pos[:count])
+        particles.color.take(rows, axis=0, out=self.color[:count])
+        self.count = count
+
+    def live(self):
+        '''Return the rows of the particles copied, which are all alive.'''
+        return range(self.count)
+
+class Frame_State():
+    '''Everything a frame draws, as it was after one tick. Only refilled while the window is not reading it.'''
+    __slots__ = ("tick", "ship", "objects", "particles", "published", "_spare")
+
+    def __init__(self, particles=None):
+        '''Intialize an empty state, with room for the particles of a system if given.'''
+        self.tick = 0
+        self.ship = Frozen_Object()
+        self.objects = []
+        self.particles = Frozen_Particles(particles) if particles is not None else None
+        self.published = 0.0
+
+        # Copies left over when the last tick had fewer objects, kept for when there are more again.
+        self._spare = []
+
+    def fill(self, tick, ship, groups, particles=None):
+        """
+        Copy a tick into the state, reusing the copies it already holds.
+        :param tick: the tick the state is taken after
+        :param ship: the ship the view is about
+        :param groups: lists of the objects to draw, copied in order
+        :param particles: the particle system, if the state has room for its particles
+        """
+        objects = self.objects
+        spare = self._spare
+        count = sum(len(group) for group in groups)
+        while len(objects) > count:
+            spare.append(objects.pop())
+        while len(objects) < count:
+            objects.append(spare.pop() if spare else Frozen_Object())
+        index = 0
+        for group in groups:
+            for obj in group:
+                objects[index].copy(obj)
+                index += 1
+        self.ship.copy(ship)
+        if particles is not None:
+            self.particles.copy(particles)
+        self.tick = tick
+        self.published = time.perf_counter()
+
+class Simulation_Thread():
+    """
+    This class runs an engine on a worker thread. The state is double
+    buffered: the thread fills the Frame_State the window is not reading,
+    then hands it over by swapping one reference. A buffer the window
+    still holds is never refilled; the thread skips that publish instead.
+    """
+
+    def __init__(self, engine, key_actions, fire_key, particles=None, budget=None, view=None):
+        """
+        Sets up a thread for an engine, stopped until start is called
+        :param engine: the engine, only touched by the thread once it starts
+        :param key_actions: the held action of every key that has one
+        :param fire_key: the key that fires a bullet
+        :param particles: a particle system stepped with the engine, or None
+        :param budget: a frame budget deciding the collision and particle strides, or None
+        :param view: (width, height) of the window when the world scrolls, to publish only what it sees
+        """
+        self.engine = engine
+        self.key_actions = key_actions
+        self.fire_key = fire_key
+        self.particles = particles
+        self.budget = budget
+        self.camera = None
+        if view is not None:
+            self.camera = Camera(view[0], view[1], engine.width, engine.height)
+
+        # The window appends, the thread pops; a deque needs no lock for either.
+        self.inputs = collections.deque()
+        self.held_keys = set()
+        self._shots = 0
+        self._particle_lag = 0.0
+
+        # The lock only guards which buffer is front and which the window holds, never the copying.
+        self._buffers = (Frame_State(particles), Frame_State(particles))
+        self._lock = threading.Lock()
+        self._reading = None
+        self.front = None
+        self.skipped = 0
+        self.publish()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Busy spans of the thread, and the span it is in right now, for the overlap report.
+        self._busy = collections.deque(maxlen=BUSY_SPANS)
+        self._busy_since = None
+        self.sim_time = 0.0
+        self.draw_time = 0.0
+        self.overlap_time = 0.0
+        self.frames = 0
+
+    def start(self):
+        '''Start stepping the engine.'''
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        '''Stop the thread and wait for its last tick to finish.'''
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        '''Step the engine whenever its clock pays out ticks, and publish the state after them.'''
+        clock = Fixed_Step_Clock(self.engine.tick_rate)
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            ticks = clock.advance(now - last)
+            last = now
+            if ticks == 0:
+                time.sleep(min(MAX_SLEEP, (1.0 - clock.alpha()) * clock.tick_time))
+                continue
+            self._busy_since = now
+            self.step(ticks)
+            self.publish()
+            end = time.perf_counter()
+
+            # Cleared first, so a frame ending in between never counts the span twice.
+            self._busy_since = None
+            self._busy.append((now, end))
+            self.sim_time += end - now
+
+    def step(self, ticks):
+        '''Apply the queued keys and run ticks ticks of the engine.'''
+        engine = self.engine
+        inputs = self.inputs
+        while inputs:
+            event, key = inputs.popleft()
+            if event == KEY_DOWN:
+                if engine.ship.alive:
+                    self.held_keys.add(key)
+                    if key == self.fire_key:
+                        self._shots += 1
+            else:
+                self.held_keys.discard(key)
+
+        particle_stride = 1
+        if self.budget is not None:
+            engine.collision_stride = self.budget.collision_stride()
+            particle_stride = self.budget.particle_stride()
+
+        # Shots fire on the first tick of the batch; held keys apply to every tick.
+        held = [self.key_actions[key] for key in self.held_keys if key in self.key_actions]
+        step_inputs = held + [FIRE] * self._shots
+        self._shots = 0
+        for tick in range(ticks):
+            engine.step(step_inputs)
+            if self.particles is not None:
+                self._particle_lag += engine.tick_scale
+                if engine.ticks % particle_stride == 0:
+                    self.particles.step(self._particle_lag)
+                    self._particle_lag = 0.0
+            step_inputs = held
+
+    def publish(self):
+        '''Fill the buffer the window is not reading with the last tick, then make it the front one.'''
+        with self._lock:
+            back = self._buffers[1] if self.front is self._buffers[0] else self._buffers[0]
+            if back is self._reading:
+                # The window is still drawing from it; the next batch publishes instead.
+                self.skipped += 1
+                return
+        engine = self.engine
+        if self.camera is not None:
+            self.camera.follow(engine.ship)
+            groups = (self.camera.visible(engine),)
+        else:
+            groups = ([engine.ship] if engine.ship.alive else (), engine.bullets, engine.asteriods)
+        back.fill(engine.ticks, engine.ship, groups, self.particles)
+        self.front = back
+
+    def acquire(self):
+        '''Return the latest state for the window to draw, which is not refilled until it is released.'''
+        with self._lock:
+            self._reading = self.front
+            return self._reading
+
+    def release(self):
+        '''Let the thread refill the state the window was drawing.'''
+        with self._lock:
+            self._reading = None
+
+    def record_draw(self, start, end):
+        '''Add a frame drawn from start to end, and how long the thread was busy meanwhile.'''
+        overlap = 0.0
+        for busy_start, busy_end in tuple(self._busy):
+            if busy_end > start:
+                overlap += max(0.0, min(busy_end, end) - max(busy_start, start))
+        busy_since = self._busy_since
+        if busy_since is not None and busy_since < end:
+            overlap += end - max(busy_since, start)
+        self.frames += 1
+        self.draw_time += end - start
+        self.overlap_time += overlap
+
+    def stats(self):
+        '''Return the ticks run, publishes skipped, busy time of each side and share of drawing that overlapped a tick.'''
+        return {"ticks": self.front.tick, "frames": self.frames, "skipped": self.skipped,
+                "sim_time": self.sim_time, "draw_time": self.draw_time, "overlap_time": self.overlap_time,
+                "overlap": self.overlap_time / self.draw_time if self.draw_time else 0.0}
@@ -0,0 +1,282 @@
+"""
+File: asteriod_snapshot.py
+This module saves and restores the full state of an asteroids game as
+a fixed-layout binary snapshot, and keeps a ring buffer of one snapshot
+per tick in a memory-mapped file. The game can rewind a few seconds,
+and offline tools can open the file and jump to any tick it still holds
+without reading the rest of it.
+"""
+import mmap
+import struct
+
+from asteriod_engine import BASE_TICK_RATE, Rock_Size
+
+MAGIC = b"ASTS"
+VERSION = 3
+
+# tick, new angle, bullets fired, rocks destroyed, bullets, asteriods, staged asteriods, wave, gauss_next
+STATE = struct.Struct("<qdIIHHHId")
+
+# x, y, dx, dy, angle, alive
+SHIP = struct.Struct("<5d?")
+
+# x, y, dx, dy, angle, life, alive, is fired, alpha
+BULLET = struct.Struct("<6d??B")
+
+# x, y, dx, dy, angle, size, alive, is hit, is split, tick next due to move, tick last moved
+# The last two only matter to far asteriods moved in bulk, which wait for their move between them.
+ROCK = struct.Struct("<5dB???qq")
+
+# The Mersenne Twister state of the random number generator: 624 words and a position.
+RNG = struct.Struct("<625I")
+
+# Size codes of the asteriods, the same as the vectorized environment.
+SMALL = Rock_Size.SMALL
+MEDIUM = Rock_Size.MEDIUM
+LARGE = Rock_Size.LARGE
+
+# Slots in every snapshot. A game with more objects than this cannot be saved.
+# The rocks of the next wave, already staged, take rock slots after those in play.
+SNAPSHOT_BULLETS = 64
+SNAPSHOT_ROCKS = 256
+
+# magic, version, snapshot size, frames, bullet slots, rock slots, newest tick
+RING_HEADER = struct.Struct("<4sHIIHHq")
+
+# Seconds of play kept by the rewind buffer.
+REWIND_SECONDS = 10
+
+class Snapshot_Format():
+    def __init__(self, bullet_slots=SNAPSHOT_BULLETS, rock_slots=SNAPSHOT_ROCKS):
+        '''Intialize the layout of a snapshot with room for the given number of objects.'''
+        self.bullet_slots = bullet_slots
+        self.rock_slots = rock_slots
+        self._ship = STATE.size
+        self._bullets = self._ship + SHIP.size
+        self._rocks = self._bullets + BULLET.size * bullet_slots
+        self._rng = self._rocks + ROCK.size * rock_slots
+        self.size = self._rng + RNG.size
+
+    def write(self, engine, buffer, offset=0):
+        """
+        Write the state of an engine into a buffer without building any objects.
+        :param engine: the engine to save
+        :param buffer: a writable buffer, such as a bytearray or an mmap
+        :param offset: where the snapshot starts in the buffer
+        """
+        bullets = engine.bullets
+        asteriods = engine.asteriods
+        waves = engine.waves
+        staged = waves.staged if waves is not None else []
+        if len(bullets) > self.bullet_slots or len(asteriods) + len(staged) > self.rock_slots:
+            raise ValueError("%d bullets and %d asteriods do not fit in %d and %d snapshot slots"
+                             % (len(bullets), len(asteriods) + len(staged), self.bullet_slots, self.rock_slots))
+
+        version, words, gauss_next = engine.rng.getstate()
+        STATE.pack_into(buffer, offset, engine.ticks, engine.new_angle, engine.bullets_fired,
+                        engine.rocks_destroyed, len(bullets), len(asteriods), len(staged),
+                        waves.wave if waves is not None else 0,
+                        float("nan") if gauss_next is None else gauss_next)
+        RNG.pack_into(buffer, offset + self._rng, *words)
+
+        ship = engine.ship
+        SHIP.pack_into(buffer, offset + self._ship, ship.center.get_x(), ship.center.get_y(),
+                       ship.velocity.get_dx(), ship.velocity.get_dy(), ship._angle, ship.alive)
+
+        at = offset + self._bullets
+        for bullet in bullets:
+            BULLET.pack_into(buffer, at, bullet.center.get_x(), bullet.center.get_y(),
+                             bullet.velocity.get_dx(), bullet.velocity.get_dy(), bullet._angle,
+                             bullet._life, bullet.alive, bullet.is_fired, bullet._alpha)
+            at += BULLET.size
+
+        at = offset + self._rocks
+        for asteriod in asteriods:
+            ROCK.pack_into(buffer, at, asteriod.center.get_x(), asteriod.center.get_y(),
+                           asteriod.velocity.get_dx(), asteriod.velocity.get_dy(), asteriod._angle,
+                           asteriod.size, asteriod.alive, asteriod.is_hit, asteriod._is_split,
+                           asteriod._lod_next, asteriod._lod_last)
+            at += ROCK.size
+
+        # A staged rock is saved with the velocity it will have, which it only gets when its wave arrives.
+        for index, asteriod in enumerate(staged):
+            dx, dy = waves.velocity(index)
+            ROCK.pack_into(buffer, at, asteriod.center.get_x(), asteriod.center.get_y(), dx, dy,
+                           asteriod._angle, asteriod.size, asteriod.alive, asteriod.is_hit, asteriod._is_split,
+                           asteriod._lod_next, asteriod._lod_last)
+            at += ROCK.size
+
+    def read(self, engine, buffer, offset=0):
+        """
+        Put an engine back in the state saved in a buffer.
+        Bullets and asteriods are taken from the pools of the engine.
+        :param engine: the engine to restore
+        :param buffer: a buffer holding a snapshot written by this format
+        :param offset: where the snapshot starts in the buffer
+        """
+        (engine.ticks, engine.new_angle, engine.bullets_fired, engine.rocks_destroyed,
+         bullet_count, rock_count, staged_count, wave, gauss_next) = STATE.unpack_from(buffer, offset)
+        words = RNG.unpack_from(buffer, offset + self._rng)
+
+        x, y, dx, dy, angle, alive = SHIP.unpack_from(buffer, offset + self._ship)
+        _place(engine.ship, x, y, dx, dy)
+        engine.ship._angle = angle
+        engine.ship.alive = alive
+
+        for bullet in engine.bullets:
+            engine.release(engine.bullet_pool, bullet)
+        del engine.bullets[:]
+        at = offset + self._bullets
+        for index in range(bullet_count):
+            x, y, dx, dy, angle, life, alive, is_fired, alpha = BULLET.unpack_from(buffer, at)
+            bullet = engine.acquire(engine.bullet_pool)
+            _place(bullet, x, y, dx, dy)
+            bullet._angle = angle
+            bullet._life = life
+            bullet.alive = alive
+            bullet.is_fired = is_fired
+            bullet._alpha = alpha
+            engine.bullets.append(bullet)
+            at += BULLET.size
+
+        waves = engine.waves
+        if waves is not None:
+            waves.discard()
+            waves.wave = wave
+        pools = engine.asteriod_pools
+        for asteriod in engine.asteriods:
+            engine.release(pools[asteriod.size], asteriod)
+        del engine.asteriods[:]
+        at = offset + self._rocks
+        for index in range(rock_count + staged_count):
+            x, y, dx, dy, angle, size, alive, is_hit, is_split, lod_next, lod_last = ROCK.unpack_from(buffer, at)
+            asteriod = engine.acquire(pools[size])
+            _place(asteriod, x, y, dx, dy)
+            asteriod._angle = angle
+            asteriod.alive = alive
+            asteriod.is_hit = is_hit
+            asteriod._is_split = is_split
+            asteriod._lod_next = lod_next
+            asteriod._lod_last = lod_last
+            if index < rock_count:
+                engine.asteriods.append(asteriod)
+            elif waves is not None:
+                waves.hold(asteriod)
+            else:
+                engine.release(pools[size], asteriod)
+            at += ROCK.size
+
+        # Large asteriods draw a random place when reset, so the generator is restored last.
+        engine.rng.setstate((3, words, None if gauss_next != gauss_next else gauss_next))
+
+    def tick(self, buffer, offset=0):
+        '''Return the tick of the snapshot saved in a buffer.'''
+        return STATE.unpack_from(buffer, offset)[0]
+
+def _place(obj, x, y, dx, dy):
+    '''Set the position and velocity of a flying object.'''
+    obj.center.set_x(x)
+    obj.center.set_y(y)
+
+    # Velocities only add up, so the old one is cleared first.
+    obj.velocity.reset()
+    obj.velocity.set_dx(dx)
+    obj.velocity.set_dy(dy)
+
+def save(engine, snapshot_format=None):
+    '''Return the state of an engine as bytes.'''
+    snapshot_format = snapshot_format or Snapshot_Format()
+    buffer = bytearray(snapshot_format.size)
+    snapshot_format.write(engine, buffer)
+    return bytes(buffer)
+
+def load(engine, data, snapshot_format=None):
+    '''Put an engine back in the state returned by save.'''
+    (snapshot_format or Snapshot_Format()).read(engine, data)
+
+class Rewind_Buffer():
+    """
+    This class keeps the snapshot of each of the last frames ticks in a
+    memory-mapped ring. Without a path the map is anonymous and lives in
+    memory only; with one, offline tools can open it with Rewind_Buffer.open.
+    """
+
+    def __init__(self, frames=REWIND_SECONDS * BASE_TICK_RATE, path=None, snapshot_format=None):
+        '''Intialize an empty ring of frames snapshots.'''
+        self.format = snapshot_format or Snapshot_Format()
+        self.frames = frames
+        size = RING_HEADER.size + self.format.size * frames
+        if path is None:
+            self._map = mmap.mmap(-1, size)
+        else:
+            with open(path, "w+b") as ring_file:
+                ring_file.truncate(size)
+                self._map = mmap.mmap(ring_file.fileno(), size)
+        self.newest = -1
+        self._write_header()
+
+    @classmethod
+    def open(cls, path):
+        '''Open a ring written by another game, read only.'''
+        ring = cls.__new__(cls)
+        with open(path, "rb") as ring_file:
+            ring._map = mmap.mmap(ring_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, ring.frames, bullet_slots, rock_slots, ring.newest = RING_HEADER.unpack_from(ring._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d asteroids rewind buffer" % (path, VERSION))
+        ring.format = Snapshot_Format(bullet_slots, rock_slots)
+        return ring
+
+    def _write_header(self):
+        '''Store the layout and the newest tick at the start of the map.'''
+        RING_HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.format.size, self.frames,
+                              self.format.bullet_slots, self.format.rock_slots, self.newest)
+
+    def _offset(self, tick):
+        '''Return where the snapshot of a tick lives in the map.'''
+        return RING_HEADER.size + (tick % self.frames) * self.format.size
+
+    def record(self, engine):
+        '''Save the current tick of an engine, over the oldest snapshot.'''
+        self.format.write(engine, self._map, self._offset(engine.ticks))
+        self.newest = engine.ticks
+        self._write_header()
+
+    def oldest(self):
+        '''Return the oldest tick still held, or -1 when the ring is empty.'''
+        if self.newest < 0:
+            return -1
+        return max(0, self.newest - self.frames + 1)
+
+    def has(self, tick):
+        '''Return whether the snapshot of a tick is still held.'''
+        return (self.oldest() <= tick <= self.newest and
+                self.format.tick(self._map, self._offset(tick)) == tick)
+
+    def restore(self, engine, tick):
+        '''Put an engine in its state at a tick still held by the ring.'''
+        if not self.has(tick):
+            raise KeyError("tick %d is not in the rewind buffer" % tick)
+        self.format.read(engine, self._map, self._offset(tick))
+
+    def rewind(self, engine, seconds):
+        '''Put an engine back as it was up to seconds ago and return the tick reached.'''
+        tick = max(self.oldest(), engine.ticks - int(round(seconds * engine.tick_rate)))
+        self.restore(engine, tick)
+
+        # Ticks after this one are about to be played again differently.
+        self.newest = tick
+        self._write_header()
+        return tick
+
+    def view(self, tick):
+        '''Return the raw snapshot of a tick, as a view into the map.'''
+        if not self.has(tick):
+            raise KeyError("tick %d is not in the rewind buffer" % tick)
+        offset = self._offset(tick)
+        return memoryview(self._map)[offset:offset + self.format.size]
+
+    def close(self):
+        '''Flush and unmap the ring.'''
+        if not self._map.closed:
+            self._map.close()
@@ -0,0 +1,149 @@
+"""
+File: asteriod_spatial.py
+This module implements a uniform-grid spatial hash for the asteroids game.
+The grid wraps around the screen edges the same way the flying objects do,
+so only objects in neighbouring cells need a narrow-phase collision check.
+The swept narrow phase finds when within a tick two moving circles first touch.
+"""
+import math
+
+def wrap_delta(delta, size):
+    '''Return the shortest signed distance along one axis of a field that wraps every size units.'''
+    return (delta + size / 2) % size - size / 2
+
+def time_of_impact(x, y, dx, dy, radius):
+    """
+    Return when two circles moving in a straight line first touch, or None.
+    :param x: x of the second circle relative to the first at the start of the tick
+    :param y: y of the second circle relative to the first at the start of the tick
+    :param dx: x the second circle moves relative to the first during the tick
+    :param dy: y the second circle moves relative to the first during the tick
+    :param radius: the sum of both radii
+    :return: the fraction of the tick, from 0 to 1, at which they touch
+    """
+    c = x * x + y * y - radius * radius
+    if c < 0:
+        # Already overlapping when the tick starts.
+        return 0.0
+    a = dx * dx + dy * dy
+    b = x * dx + y * dy
+    if a == 0 or b >= 0:
+        # Not moving towards each other.
+        return None
+    discriminant = b * b - a * c
+    if discriminant < 0:
+        return None
+    t = (-b - math.sqrt(discriminant)) / a
+    return t if t <= 1.0 else None
+
+class Spatial_Hash():
+    def __init__(self, cell_size, width, height):
+        '''Intialize an empty grid of cell_size cells over a width x height field.'''
+        self.cell_size = cell_size
+        self.width = width
+        self.height = height
+
+        # Stretch the cells a little so a whole number of them spans the field.
+        self._cols = max(1, int(width // cell_size))
+        self._rows = max(1, int(height // cell_size))
+        self._cell_width = width / self._cols
+        self._cell_height = height / self._rows
+        self._cells = {}
+        self._count = 0
+        self.queries = 0
+        self.candidates = 0
+
+    def _cell(self, x, y):
+        '''Return the column and row of the cell holding a point, wrapping around the edges.'''
+        # Neighbouring points get neighbouring cells even when they are past an edge.
+        column = int(math.floor(x / self._cell_width)) % self._cols
+        row = int(math.floor(y / self._cell_height)) % self._rows
+        return column, row
+
+    def clear(self):
+        '''Empty the grid before it is rebuilt for a new tick.'''
+        self._cells.clear()
+        self._count = 0
+        self.queries = 0
+        self.candidates = 0
+
+    def insert(self, item, x, y):
+        '''Put an item in the cell holding its center.'''
+        column, row = self._cell(x, y)
+        key = row * self._cols + column
+        bucket = self._cells.get(key)
+        if bucket is None:
+            self._cells[key] = [item]
+        else:
+            bucket.append(item)
+        self._count += 1
+
+    def insert_array(self, positions):
+        '''Put items 0 to N-1 in the cells holding an (N, 2) NumPy array of centers, grouped in bulk.'''
+        if not len(positions):
+            return
+        keys = ((positions[:, 1] // self._cell_height).astype(int) % self._rows * self._cols +
+                (positions[:, 0] // self._cell_width).astype(int) % self._cols)
+
+        # A stable sort keeps every bucket in item order, as inserting one at a time does.
+        order = keys.argsort(kind="stable")
+        keys = keys[order]
+        starts = [0] + ((keys[1:] != keys[:-1]).nonzero()[0] + 1).tolist()
+        ends = starts[1:] + [len(keys)]
+        order = order.tolist()
+        cells = self._cells
+        for key, start, end in zip(keys[starts].tolist(), starts, ends):
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = order[start:end]
+            else:
+                bucket.extend(order[start:end])
+        self._count += len(order)
+
+    def query(self, x, y, reach, reach_y=None):
+        '''Return the sorted items of every cell within reach of a point, or within reach by reach_y.'''
+        column, row = self._cell(x, y)
+        span_x = int(math.ceil(reach / self._cell_width))
+        span_y = int(math.ceil((reach if reach_y is None else reach_y) / self._cell_height))
+        columns = [(column + dx) % self._cols for dx in range(-span_x, span_x + 1)]
+        rows = [((row + dy) % self._rows) * self._cols for dy in range(-span_y, span_y + 1)]
+
+        # A reach wider than a small grid wraps onto the same cells; only then are they deduplicated.
+        if len(columns) > self._cols:
+            columns = sorted(set(columns))
+        if len(rows) > self._rows:
+            rows = sorted(set(rows))
+
+        found = []
+        cells = self._cells
+        if len(cells) < len(rows) * len(columns):
+            # Fewer occupied cells than cells in reach: test each occupied one instead.
+            rows = set(rows)
+            columns = set(columns)
+            for key, bucket in cells.items():
+                column = key % self._cols
+                if column in columns and key - column in rows:
+                    found.extend(bucket)
+        else:
+            for start in rows:
+                for column in columns:
+                    bucket = cells.get(start + column)
+                    if bucket:
+                        found.extend(bucket)
+        found.sort()
+
+        self.queries += 1
+        self.candidates += len(found)
+        return found
+
+    def stats(self):
+        '''Return bucket occupancy numbers, used to tune the cell size.'''
+        occupied = len(self._cells)
+        return {"cell_size": (self._cell_width, self._cell_height),
+                "cells": self._cols * self._rows,
+                "occupied": occupied,
+                "items": self._count,
+                "max_bucket": max((len(bucket) for bucket in self._cells.values()), default=0),
+                "mean_bucket": self._count / occupied if occupied else 0.0,
+                "queries": self.queries,
+                "candidates_per_query": self.candidates / self.queries if self.queries else 0.0}
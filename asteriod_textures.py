@@ -0,0 +1,93 @@
+"""
+File: asteriod_textures.py
+This module implements a process-wide texture registry for the asteroids game.
+Every image in the images folder is decoded once and handed out as a shared
+texture handle; the sprite lists batch them through arcade's own atlas.
+Nothing is imported or read from disk until the first texture is needed,
+and the images can be decoded on a background thread while the window opens.
+"""
+import os
+import threading
+
+IMAGE_DIR = "images"
+
+class Texture_Handle():
+    def __init__(self, path, texture):
+        '''Intialize a shared texture handle with its cached size.'''
+        self.path = path
+        self.texture = texture
+        self.width = texture.width
+        self.height = texture.height
+
+class Texture_Registry():
+    def __init__(self, image_dir=IMAGE_DIR):
+        '''Intialize an empty registry for the images in image_dir.'''
+        self._image_dir = image_dir
+        self._handles = {}
+
+        # Images decoded ahead of time, until the texture they become is built.
+        self._decoded = {}
+        self._preloaded = False
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.hits = 0
+
+    def _key(self, path):
+        '''Return the registry key of an image path.'''
+        return os.path.normpath(path)
+
+    def _decode(self, path):
+        '''Read an image from disk. This is the only place doing image I/O.'''
+        from PIL import Image
+        self.loads += 1
+        return Image.open(path).convert("RGBA")
+
+    def decode_all(self):
+        '''Decode every image of the image folder once, ahead of the textures being asked for.'''
+        with self._lock:
+            if self._preloaded:
+                return
+            for name in sorted(os.listdir(self._image_dir)):
+                if name.endswith(".png"):
+                    path = os.path.join(self._image_dir, name)
+                    key = self._key(path)
+                    if key not in self._handles and key not in self._decoded:
+                        self._decoded[key] = self._decode(path)
+            self._preloaded = True
+
+    def preload(self):
+        '''Decode the images on a background thread and return the thread.'''
+        thread = threading.Thread(target=self.decode_all, name="texture-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def get(self, path):
+        '''Return the shared texture handle of an image.'''
+        key = self._key(path)
+        handle = self._handles.get(key)
+        if handle is not None:
+            self.hits += 1
+            return handle
+
+        import arcade
+        with self._lock:
+            if key in self._handles:
+                self.hits += 1
+                return self._handles[key]
+
+            # The texture keeps the image, so the registry lets go of its own reference.
+            image = self._decoded.pop(key, None)
+            if image is None:
+                image = self._decode(path)
+            else:
+                self.hits += 1
+            handle = Texture_Handle(key, arcade.Texture(key, image=image))
+            self._handles[key] = handle
+        return handle
+
+    def stats(self):
+        '''Return how many images were loaded from disk versus served from the cache.'''
+        return {"loads": self.loads, "hits": self.hits, "textures": len(self._handles)}
+
+# The one registry shared by every object of the game.
+TEXTURES = Texture_Registry()
@@ -0,0 +1,246 @@
+"""
+File: asteriod_vector_env.py
+This module implements a batched asteroids environment for bots.
+N independent games are simulated in lockstep over shared NumPy arrays,
+with no Python loop over the games, and every finished game starts a new
+episode on its own.
+"""
+import numpy as np
+from asteriod_engine import (SCREEN_WIDTH, SCREEN_HEIGHT, BULLET_RADIUS, BULLET_SPEED, BULLET_LIFE,
+                             SHIP_TURN_AMOUNT, SHIP_THRUST_AMOUNT, SHIP_RADIUS, INITIAL_ROCK_COUNT,
+                             BIG_ROCK_SPIN, BIG_ROCK_SPEED, BIG_ROCK_RADIUS, MEDIUM_ROCK_SPIN,
+                             MEDIUM_ROCK_RADIUS, SMALL_ROCK_SPIN, SMALL_ROCK_RADIUS, BULLET_POOL_SIZE)
+from asteriod_motion import directions, normalize_angles, thrust_many
+
+# Columns of the action array.
+ACTION_TURN_LEFT = 0
+ACTION_TURN_RIGHT = 1
+ACTION_THRUST = 2
+ACTION_REVERSE = 3
+ACTION_FIRE = 4
+ACTION_COUNT = 5
+
+# Size codes of a rock slot. An empty slot has size 0.
+EMPTY = 0
+SMALL = 1
+MEDIUM = 2
+LARGE = 3
+
+# Spin and radius of a rock, looked up by its size code.
+ROCK_SPIN = np.array([0, SMALL_ROCK_SPIN, MEDIUM_ROCK_SPIN, BIG_ROCK_SPIN], dtype=np.float64)
+ROCK_RADIUS = np.array([0, SMALL_ROCK_RADIUS, MEDIUM_ROCK_RADIUS, BIG_ROCK_RADIUS], dtype=np.float64)
+
+# A large rock becomes two medium and one small rock, a medium rock two small rocks,
+# so no more than five rocks per large rock are ever alive at once.
+ROCK_SLOTS = INITIAL_ROCK_COUNT * 5
+
+# Per game: ship (x, y, dx, dy, angle), rocks (x, y, dx, dy, angle, size)
+# and bullets (x, y, dx, dy, life left).
+SHIP_FIELDS = 5
+ROCK_FIELDS = 6
+BULLET_FIELDS = 5
+
+DEFAULT_MAX_TICKS = 60 * 60
+
+class Vector_Env():
+    def __init__(self, count, seed=None, max_ticks=DEFAULT_MAX_TICKS,
+                 width=SCREEN_WIDTH, height=SCREEN_HEIGHT,
+                 rock_slots=ROCK_SLOTS, bullet_slots=BULLET_POOL_SIZE):
+        '''Intialize count games, all of them at the start of an episode.'''
+        self.count = count
+        self.max_ticks = max_ticks
+        self.width = width
+        self.height = height
+        self.rock_slots = rock_slots
+        self.bullet_slots = bullet_slots
+        self.rng = np.random.default_rng(seed)
+        self._size = np.array([width, height], dtype=np.float64)
+
+        # One row per game. Everything below is a view into this array, and so
+        # are the observations handed to the bots.
+        rocks_start = SHIP_FIELDS
+        bullets_start = rocks_start + rock_slots * ROCK_FIELDS
+        self.state = np.zeros((count, bullets_start + bullet_slots * BULLET_FIELDS), dtype=np.float64)
+
+        self.ship = self.state[:, :rocks_start]
+        self.ship_pos = self.ship[:, 0:2]
+        self.ship_vel = self.ship[:, 2:4]
+        self.ship_angle = self.ship[:, 4]
+
+        self.rocks = self.state[:, rocks_start:bullets_start].reshape(count, rock_slots, ROCK_FIELDS)
+        self.rock_pos = self.rocks[:, :, 0:2]
+        self.rock_vel = self.rocks[:, :, 2:4]
+        self.rock_angle = self.rocks[:, :, 4]
+        self.rock_size = self.rocks[:, :, 5]
+
+        self.bullets = self.state[:, bullets_start:].reshape(count, bullet_slots, BULLET_FIELDS)
+        self.bullet_pos = self.bullets[:, :, 0:2]
+        self.bullet_vel = self.bullets[:, :, 2:4]
+        self.bullet_life = self.bullets[:, :, 4]
+
+        self.ticks = np.zeros(count, dtype=np.int64)
+        self.episode_return = np.zeros(count, dtype=np.float64)
+        self.last_episode_return = np.zeros(count, dtype=np.float64)
+        self.last_episode_length = np.zeros(count, dtype=np.int64)
+        self.episodes = 0
+
+        self.reset()
+
+    def reset(self):
+        '''Start a new episode in every game and return the observations.'''
+        self._reset_games(np.ones(self.count, dtype=bool))
+        return self.state
+
+    def _reset_games(self, mask):
+        '''Start a new episode in the games selected by mask.'''
+        games = np.flatnonzero(mask)
+        if games.size == 0:
+            return
+        self.state[games] = 0.0
+        self.ship_pos[games] = (self.width / 2, self.width - self.height)
+        self.ship_angle[games] = 90.0
+
+        # Same placement rule as Large_Asteriods.
+        new = (games.size, INITIAL_ROCK_COUNT)
+        self.rock_pos[games, :INITIAL_ROCK_COUNT, 0] = self.rng.integers(0, self.width + 1, new)
+        self.rock_pos[games, :INITIAL_ROCK_COUNT, 1] = self.rng.integers(0, self.height + 1, new)
+        self.rock_vel[games, :INITIAL_ROCK_COUNT] = BIG_ROCK_SPEED * self.rng.integers(-1, 2, new + (2,))
+        self.rock_size[games, :INITIAL_ROCK_COUNT] = LARGE
+
+        self.ticks[games] = 0
+        self.episode_return[games] = 0.0
+
+    def step(self, actions):
+        """
+        Move every game forward one tick.
+        :param actions: (count, ACTION_COUNT) array of held actions, fire meaning one shot
+        :return: observations, rewards and done flags, one row per game
+        """
+        actions = np.asarray(actions, dtype=bool)
+        heading = directions(self.ship_angle)
+
+        # Fire on press, before anything moves, like Game.on_key_press.
+        self._fire(actions[:, ACTION_FIRE], heading)
+
+        # Advance and wrap everything around the screen.
+        self.ship_pos += self.ship_vel
+        self.rock_pos += self.rock_vel
+        self.bullet_pos += self.bullet_vel
+        self.rock_angle += ROCK_SPIN[self.rock_size.astype(np.intp)]
+        np.mod(self.ship_pos, self._size, out=self.ship_pos)
+        np.mod(self.rock_pos, self._size, out=self.rock_pos)
+        np.mod(self.bullet_pos, self._size, out=self.bullet_pos)
+
+        # Age the bullets. A bullet with no life left is an empty slot.
+        np.maximum(self.bullet_life - 1, 0, out=self.bullet_life)
+        self.bullets[self.bullet_life == 0] = 0.0
+
+        # Thrust along the heading the tick started with, then turn.
+        push = actions[:, ACTION_THRUST].astype(np.float64) - actions[:, ACTION_REVERSE]
+        thrust_many(self.ship_vel, self.ship_angle, push * SHIP_THRUST_AMOUNT)
+        turn = actions[:, ACTION_TURN_LEFT].astype(np.float64) - actions[:, ACTION_TURN_RIGHT]
+        self.ship_angle += turn * SHIP_TURN_AMOUNT
+        normalize_angles(self.ship_angle)
+
+        reward = self._collide()
+
+        self.ticks += 1
+        self.episode_return += reward
+        done = (self.rock_size == EMPTY).all(axis=1) | (self.ticks >= self.max_ticks)
+
+        # Finished games start over; their observation is the first one of the new episode.
+        if done.any():
+            self.last_episode_return[done] = self.episode_return[done]
+            self.last_episode_length[done] = self.ticks[done]
+            self.episodes += int(done.sum())
+            self._reset_games(done)
+        return self.state, reward, done
+
+    def _fire(self, fire, heading):
+        '''Put a bullet in the first empty bullet slot of every game that fires.'''
+        empty = self.bullet_life == 0
+        fire = fire & empty.any(axis=1)
+        games = np.flatnonzero(fire)
+        if games.size == 0:
+            return
+        slots = empty[games].argmax(axis=1)
+        self.bullet_pos[games, slots] = self.ship_pos[games]
+        self.bullet_vel[games, slots] = heading[games] * BULLET_SPEED
+        self.bullet_life[games, slots] = BULLET_LIFE
+
+    def _collide(self):
+        '''Split every rock hit by a bullet or the ship and return the rocks shot per game.'''
+        rock_alive = self.rock_size != EMPTY
+        bullet_alive = self.bullet_life > 0
+        radius = ROCK_RADIUS[self.rock_size.astype(np.intp)]
+
+        # The box test Engine.check_collisions makes with USE_SWEPT_COLLISIONS off, for every bullet
+        # and rock pair at once. The engine's swept circles cost too much for every pair of every game.
+        reach = BULLET_RADIUS + radius[:, None, :]
+        hits = np.abs(self.bullet_pos[:, :, None, 0] - self.rock_pos[:, None, :, 0]) < reach
+        hits &= np.abs(self.bullet_pos[:, :, None, 1] - self.rock_pos[:, None, :, 1]) < reach
+        hits &= bullet_alive[:, :, None] & rock_alive[:, None, :]
+
+        # A bullet destroys the first rock it touches and is used up.
+        bullet_hit = hits.any(axis=2)
+        games, bullets = np.nonzero(bullet_hit)
+        shot = np.zeros_like(rock_alive)
+        shot[games, hits[games, bullets].argmax(axis=1)] = True
+        self.bullets[bullet_hit] = 0.0
+
+        # Rocks touching the ship split too, but score nothing.
+        reach = SHIP_RADIUS + radius
+        rammed = np.abs(self.rock_pos[:, :, 0] - self.ship_pos[:, None, 0]) < reach
+        rammed &= np.abs(self.rock_pos[:, :, 1] - self.ship_pos[:, None, 1]) < reach
+        rammed &= rock_alive
+
+        self._split(shot | rammed)
+        return shot.sum(axis=1).astype(np.float64)
+
+    def _split(self, hit):
+        '''Replace every hit rock by its children, like Engine.cleanup_zombies.'''
+        games, slots = np.nonzero(hit)
+        if games.size == 0:
+            return
+        size = self.rock_size[games, slots].astype(np.intp)
+        pos = self.rock_pos[games, slots]
+        vel = self.rock_vel[games, slots]
+        self.rocks[games, slots] = 0.0
+
+        large = size == LARGE
+        medium = size == MEDIUM
+        lp, lv, lg = pos[large], vel[large], games[large]
+        mp, mv, mg = pos[medium], vel[medium], games[medium]
+
+        # A large rock becomes two medium rocks and one small rock.
+        fast = lv + 2
+        side = np.stack([fast[:, 0], np.zeros(len(fast))], axis=1)
+        # A medium rock becomes two small rocks.
+        slow = mv + 1.5
+
+        self._spawn(np.concatenate([lg, lg, lg, mg, mg]),
+                    np.concatenate([np.full(len(lg), MEDIUM), np.full(len(lg), MEDIUM), np.full(len(lg), SMALL),
+                                    np.full(len(mg), SMALL), np.full(len(mg), SMALL)]),
+                    np.concatenate([lp + (20, 20), lp - (20, 20), lp + (20, -20), mp + (20, 20), mp - (20, 20)]),
+                    np.concatenate([fast, -fast, side, slow, -slow]))
+
+    def _spawn(self, games, sizes, pos, vel):
+        '''Put new rocks in the empty rock slots of their games.'''
+        if games.size == 0:
+            return
+        order = np.argsort(games, kind="stable")
+        games, sizes, pos, vel = games[order], sizes[order], pos[order], vel[order]
+
+        # The k-th new rock of a game takes the k-th empty slot of that game.
+        counts = np.bincount(games, minlength=self.count)
+        rank = np.arange(games.size) - (np.cumsum(counts) - counts)[games]
+        empty = self.rock_size == EMPTY
+        empty_slots = np.argsort(~empty, axis=1, kind="stable")
+        fits = rank < empty.sum(axis=1)[games]
+
+        games, rank = games[fits], rank[fits]
+        slots = empty_slots[games, rank]
+        self.rock_pos[games, slots] = np.mod(pos[fits], self._size)
+        self.rock_vel[games, slots] = vel[fits]
+        self.rock_angle[games, slots] = 0.0
+        self.rock_size[games, slots] = sizes[fits]
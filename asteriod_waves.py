@@ -0,0 +1,119 @@
+"""
+File: asteriod_waves.py
+This module implements the waves of the asteroids game. Once a wave is
+in play, the rocks of the next one are taken from the pool a few at a
+time every tick and set aside with their places already drawn. When the
+field is cleared the staged rocks join the game in one list extend, so
+the tick a wave arrives costs the same however large the wave is.
+"""
+from array import array
+
+from asteriod_spatial import Spatial_Hash, wrap_delta
+
+# Rocks of the next wave built every tick while the current one is in play.
+WAVE_SPAWN_BUDGET = 32
+
+# A new rock never arrives closer than this to a ship.
+WAVE_SAFE_DISTANCE = 150
+
+class Wave_Spawner():
+    def __init__(self, engine, size, budget=WAVE_SPAWN_BUDGET, safe_distance=WAVE_SAFE_DISTANCE):
+        '''Intialize a spawner staging waves of size large asteriods for an engine, budget a tick.'''
+        self.engine = engine
+        self.size = size
+        self.budget = budget
+        self.safe_distance = safe_distance
+        self.wave = 1
+        self.staged = []
+
+        # Staged rocks by place, so only those near a ship are looked at when the wave arrives.
+        self._places = Spatial_Hash(safe_distance, engine.width, engine.height)
+
+        # A staged rock bound to the NumPy world keeps still and does not spin until it arrives,
+        # like one on plain objects, which is not advanced at all.
+        self._rows = array("q")
+        self._velocities = array("d")
+        self.forced = 0
+        self.relocated = 0
+
+    def update(self):
+        '''Stage the next wave within budget, and let it in once the field is clear.'''
+        if not self.engine.asteriods:
+            self.activate()
+        elif len(self.staged) < self.size:
+            self.stage(self.budget)
+
+    def stage(self, count):
+        '''Take up to count more rocks of the next wave from the pool.'''
+        engine = self.engine
+        for index in range(len(self.staged), min(self.size, len(self.staged) + count)):
+            self.hold(engine.acquire(engine.large_asteriod_pool))
+
+    def hold(self, asteriod):
+        '''Set a rock taken from the pool aside for the next wave, where it is and as it moves.'''
+        if self.engine.world is not None:
+            self._rows.append(asteriod._row)
+            self._velocities.append(asteriod.velocity.get_dx())
+            self._velocities.append(asteriod.velocity.get_dy())
+            asteriod.velocity.reset()
+            self.engine.world.set_spins((asteriod._row,), 0.0)
+        self._places.insert(len(self.staged), asteriod.center.get_x(), asteriod.center.get_y())
+        self.staged.append(asteriod)
+
+    def velocity(self, index):
+        '''Return the (dx, dy) a staged rock will have once its wave arrives.'''
+        if self.engine.world is not None:
+            return self._velocities[2 * index], self._velocities[2 * index + 1]
+        velocity = self.staged[index].velocity
+        return velocity.get_dx(), velocity.get_dy()
+
+    def activate(self):
+        '''Put the staged wave in play, finishing it first if the budget fell short.'''
+        engine = self.engine
+        if len(self.staged) < self.size:
+            self.forced += 1
+            self.stage(self.size - len(self.staged))
+
+        # Rocks staged where a ship is now go to the far side of the field.
+        staged = self.staged
+        half_width = engine.width / 2
+        half_height = engine.height / 2
+        for ship in engine.player_ships():
+            if not ship.alive:
+                continue
+            x = ship.center.get_x()
+            y = ship.center.get_y()
+            for index in self._places.query(x, y, self.safe_distance):
+                center = staged[index].center
+                if (wrap_delta(center.get_x() - x, engine.width) ** 2 +
+                        wrap_delta(center.get_y() - y, engine.height) ** 2 < self.safe_distance ** 2):
+                    center.set_x((center.get_x() + half_width) % engine.width)
+                    center.set_y((center.get_y() + half_height) % engine.height)
+                    self.relocated += 1
+
+        if self._rows:
+            engine.world.set_velocities(self._rows, self._velocities)
+            engine.world.set_spins(self._rows, [asteriod._spin for asteriod in staged])
+        engine.asteriods.extend(staged)
+        engine._grid_tick = None
+        self._forget()
+        self.wave += 1
+
+    def discard(self):
+        '''Give the rocks of a staged wave that never arrived back to the pool.'''
+        engine = self.engine
+        for asteriod in self.staged:
+            engine.release(engine.large_asteriod_pool, asteriod)
+        self._forget()
+
+    def _forget(self):
+        '''Start staging the next wave from nothing.'''
+        self.staged = []
+        self._rows = array("q")
+        self._velocities = array("d")
+        self._places.clear()
+
+    def stats(self):
+        '''Return the wave number, the rocks staged and how often the budget fell short.'''
+        return {"wave": self.wave, "staged": len(self.staged), "size": self.size,
+                "forced": self.forced, "relocated": self.relocated}
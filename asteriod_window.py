@@ -0,0 +1,448 @@
+"""
+File: asteriod_window.py
+This module implements the arcade window of the asteroids game.
+It is only imported once a window is about to open, because importing
+arcade is the slowest part of starting the game.
+"""
+import arcade
+import itertools
+import os
+import tempfile
+import time
+from asteriod_budget import Frame_Budget
+from asteriod_camera import Camera
+from asteriod_clock import Fixed_Step_Clock
+from asteriod_engine import (Engine, SHIP_IMAGE, BULLET_IMAGE,
+                             BIG_ROCK_IMAGE, MEDIUM_ROCK_IMAGE, SMALL_ROCK_IMAGE,
+                             TURN_LEFT, TURN_RIGHT, THRUST, REVERSE, FIRE)
+from asteriod_net import Remote_Object
+from asteriod_particles import Particle_System, PARTICLE_CAP
+from asteriod_profiler import Frame_Profiler
+from asteriod_render import Sprite_Renderer, Particle_Renderer
+from asteriod_sim_thread import Simulation_Thread, KEY_DOWN, KEY_UP
+from asteriod_replay import ACTION_BITS
+from asteriod_snapshot import Rewind_Buffer
+from asteriod_textures import TEXTURES
+
+# Draw everything through one persistent sprite list per image.
+USE_SPRITE_BATCHES = True
+
+# Simulation ticks a second and frames a second. They can be set on their own
+# and the game plays at the same speed.
+SIMULATION_RATE = 60
+DISPLAY_RATE = 60
+
+# F3 turns the profiler and its overlay on and off, F4 saves its trace to the temp folder,
+# never into a checkout. A threaded game shows the overlay without the profiler.
+PROFILER_KEY = arcade.key.F3
+TRACE_KEY = arcade.key.F4
+TRACE_FILE = os.path.join(tempfile.gettempdir(), "asteriod_trace.json")
+HUD_FONT_SIZE = 10
+
+# Give up non-essential work while frames run over budget.
+USE_FRAME_BUDGET = True
+
+# Explosions and exhaust, from a ring of at most PARTICLE_CAP particles by default.
+USE_PARTICLES = True
+
+# Every tick is saved to a ring in memory, and BACKSPACE rewinds the game this many seconds.
+USE_REWIND = True
+REWIND_KEY = arcade.key.BACKSPACE
+REWIND_STEP_SECONDS = 3
+
+# Step the engine on a thread of its own, so drawing a frame and running a tick overlap.
+USE_SIM_THREAD = False
+
+# The arcade keys that stand for the held actions of the engine.
+KEY_ACTIONS = {arcade.key.LEFT: TURN_LEFT,
+               arcade.key.RIGHT: TURN_RIGHT,
+               arcade.key.UP: THRUST,
+               arcade.key.DOWN: REVERSE}
+
+class Game(arcade.Window):
+    """
+    This class handles all the game callbacks and interaction.
+    It feeds the keys into the engine and draws the state of the
+    engine, which runs all the game rules.
+    You are welcome to modify anything in this class.
+    """
+
+    def __init__(self, width, height, seed=None, world_width=None, world_height=None, particle_cap=PARTICLE_CAP,
+                 threaded=USE_SIM_THREAD):
+        """
+        Sets up the initial conditions of the game
+        :param width: Screen width
+        :param height: Screen height
+        :param seed: seed of the random number generator placing the asteriods
+        :param world_width: World width when it is larger than the screen
+        :param world_height: World height when it is larger than the screen
+        :param particle_cap: most particles alive at once, 0 for none
+        :param threaded: step the engine on its own thread and draw the states it publishes
+        """
+        super().__init__(width, height, update_rate=1 / DISPLAY_RATE)
+        arcade.set_background_color(arcade.color.SMOKY_BLACK)
+
+        self.held_keys = set()
+        self._shots = 0
+
+        self.clock = Fixed_Step_Clock(SIMULATION_RATE)
+        world_width = world_width or width
+        world_height = world_height or height
+        self.engine = Engine(world_width, world_height, seed, tick_rate=SIMULATION_RATE)
+        
+        # A world larger than the window scrolls with the ship; otherwise everything is always in view.
+        self.camera = None
+        if (world_width, world_height) != (width, height):
+            self.camera = Camera(width, height, world_width, world_height)
+        
+        self.renderer = None
+        if USE_SPRITE_BATCHES:
+            self.renderer = Sprite_Renderer([SHIP_IMAGE, BULLET_IMAGE, BIG_ROCK_IMAGE, MEDIUM_ROCK_IMAGE, SMALL_ROCK_IMAGE])
+        self._draw_calls = 0
+        self._submit_time = 0.0
+        
+        self.budget = None
+        if USE_FRAME_BUDGET:
+            self.budget = Frame_Budget()
+        self._update_time = 0.0
+        
+        # Base ticks the particles are behind while they step every other tick.
+        self._particle_lag = 0.0
+        
+        # Effects are only decoration, so a game without numpy simply has none.
+        self.particles = None
+        self.particle_renderer = None
+        if USE_PARTICLES and particle_cap:
+            try:
+                self.particles = Particle_System(world_width, world_height, particle_cap, seed)
+            except ImportError:
+                pass
+            else:
+                self.engine.emitter = self.particles
+        
+        # Only built while profiling, so the game pays nothing for it otherwise.
+        self.profiler = None
+        self.show_hud = False
+
+        # The snapshot slots hold one screen of asteriods, so a scrolling world is not rewound.
+        # Nor is a threaded game, whose engine only its own thread may touch.
+        self.rewind = None
+        if USE_REWIND and self.camera is None and not threaded:
+            self.rewind = Rewind_Buffer()
+            self.rewind.record(self.engine)
+
+        # Started by the first update, once anything recording the engine is attached.
+        self.simulation = None
+        if threaded:
+            view = (width, height) if self.camera is not None else None
+            self.simulation = Simulation_Thread(self.engine, KEY_ACTIONS, arcade.key.SPACE,
+                                                self.particles, self.budget, view)
+
+        # Called once with the window after the first frame is drawn.
+        self.on_first_frame = None
+               
+    def on_draw(self):
+        """
+        Called automatically by the arcade framework.
+        Handles the responsibility of drawing all elements.
+        """
+
+        # clear the screen to begin drawing
+        arcade.start_render()
+
+        # TODO: draw each object
+        start = time.perf_counter()
+        if self.simulation is not None:
+            state = self.simulation.acquire()
+            self.draw_state(state)
+            self.draw_particles(state.particles)
+            self.simulation.release()
+        else:
+            self.draw_objects()
+            self.draw_particles()
+        draw_time = time.perf_counter() - start
+        if self.simulation is not None:
+            self.simulation.record_draw(start, start + draw_time)
+        
+        if self.budget is not None:
+            self.budget.end_frame(self._update_time, draw_time)
+            self._update_time = 0.0
+        
+        if self.profiler is not None:
+            self.profiler.end_frame(start, draw_time)
+        if self.show_hud:
+            self.draw_hud()
+
+        if self.on_first_frame is not None:
+            callback, self.on_first_frame = self.on_first_frame, None
+            callback(self)
+    
+    def draw_objects(self):
+        '''Draw the ship, the bullets and the asteriods.'''
+        engine = self.engine
+        
+        # Draw each object where it was between the last two ticks.
+        back = (1.0 - self.clock.alpha()) * engine.tick_scale
+        if self.camera is not None:
+            self.camera.follow(engine.ship, back)
+            objects = self.decimate(self.camera.visible(engine))
+            if self.renderer is not None:
+                self.renderer.draw(objects, engine.world, back, self.camera)
+                return
+            start = time.perf_counter()
+            for obj in objects:
+                self.draw_object(obj, back)
+            self._draw_calls = len(objects)
+            self._submit_time = time.perf_counter() - start
+            return
+        
+        if self.renderer is not None:
+            ships = [engine.ship] if engine.ship.alive else []
+            self.renderer.draw(self.decimate(itertools.chain(ships, engine.bullets, engine.asteriods)),
+                               engine.world, back)
+            return
+        
+        start = time.perf_counter()
+        if engine.ship.alive:
+            self.draw_object(engine.ship, back)
+
+        for bullet in engine.bullets:
+            self.draw_object(bullet, back)
+        
+        asteriods = self.decimate(engine.asteriods)
+        for asteriod in asteriods:
+            self.draw_object(asteriod, back)
+        
+        self._draw_calls = int(engine.ship.alive) + len(engine.bullets) + len(asteriods)
+        self._submit_time = time.perf_counter() - start
+    
+    def draw_state(self, state):
+        '''Draw the ship, the bullets and the asteriods of a state published by the simulation thread.'''
+        # The state is as it was on its tick; draw it back to where the tick before ended.
+        alpha = min(1.0, (time.perf_counter() - state.published) * self.engine.tick_rate)
+        back = (1.0 - alpha) * self.engine.tick_scale
+        if self.camera is not None:
+            self.camera.follow(state.ship, back)
+        objects = self.decimate(state.objects, state.ship)
+        if self.renderer is not None:
+            self.renderer.draw(objects, None, back, self.camera)
+            return
+        start = time.perf_counter()
+        for obj in objects:
+            self.draw_object(obj, back)
+        self._draw_calls = len(objects)
+        self._submit_time = time.perf_counter() - start
+    
+    def decimate(self, objects, ship=None):
+        '''Return the objects the frame budget leaves worth drawing around the ship.'''
+        if self.budget is None:
+            return objects
+        return self.budget.decimate(objects, ship or self.engine.ship, self.engine.width, self.engine.height)
+    
+    def draw_particles(self, particles=None):
+        '''Draw every live particle in one batch, or a copy of them published by the simulation thread.'''
+        if self.particles is None:
+            return
+        if self.particle_renderer is None:
+            # Built on the first frame, once the window has a GL context.
+            self.particle_renderer = Particle_Renderer(self.particles)
+        self.particle_renderer.draw(self.camera, particles)
+    
+    def draw_object(self, obj, back=0.0):
+        '''Display a flying object on screen with its own draw call, back base ticks along its path.'''
+        texture = TEXTURES.get(obj._img)
+        x = obj.center.get_x() - obj.velocity.get_dx() * back
+        y = obj.center.get_y() - obj.velocity.get_dy() * back
+        if self.camera is not None:
+            x, y = self.camera.to_screen(x, y)
+        arcade.draw_texture_rectangle(x, y, texture.width, texture.height, texture.texture,
+                                      obj._angle - obj._spin * back, obj._alpha)
+    
+    def draw_hud(self):
+        '''Display the rolling phase timings and entity counts of the profiler.'''
+        y = self.height - 2 * HUD_FONT_SIZE
+        lines = self.profiler.hud_lines() if self.profiler is not None else []
+        if self.budget is not None:
+            stats = self.budget.stats()
+            lines.append("budget level %d (%s)  cost %.2f/%.2f ms"
+                         % (stats["level"], stats["name"], stats["cost"] * 1e3, stats["budget"] * 1e3))
+        if self.engine.waves is not None:
+            stats = self.engine.waves.stats()
+            lines.append("wave %d  staged %d/%d  forced %d"
+                         % (stats["wave"], stats["staged"], stats["size"], stats["forced"]))
+        if self.simulation is not None:
+            stats = self.simulation.stats()
+            lines.append("sim thread tick %d  sim %.0f ms  draw %.0f ms  overlap %.0f%% of drawing"
+                         % (stats["ticks"], stats["sim_time"] * 1e3, stats["draw_time"] * 1e3,
+                            stats["overlap"] * 100))
+        if self.particles is not None:
+            stats = self.particles.stats()
+            draw_time = self.particle_renderer.draw_time if self.particle_renderer is not None else 0.0
+            lines.append("particles %d/%d  step %.3f ms  draw %.3f ms  recycled %d"
+                         % (stats["particles"], stats["capacity"], stats["step_time"] * 1e3,
+                            draw_time * 1e3, stats["recycled"]))
+        for line in lines:
+            arcade.draw_text(line, HUD_FONT_SIZE, y, arcade.color.WHITE, HUD_FONT_SIZE, font_name="Courier New")
+            y -= HUD_FONT_SIZE * 1.5
+    
+    def toggle_profiler(self):
+        '''Start or stop profiling the engine.'''
+        self.show_hud = not self.show_hud
+        if self.profiler is not None:
+            self.profiler.close()
+            self.profiler = None
+        elif self.simulation is None:
+            # The profiler wraps the engine and reads its pools, which a threaded game only touches on its own thread.
+            self.profiler = Frame_Profiler(self.engine)
+    
+    def draw_stats(self):
+        '''Return the draw calls and submit time of the last frame.'''
+        if self.renderer is not None:
+            return self.renderer.stats()
+        return {"draw_calls": self._draw_calls, "sprites": self._draw_calls,
+                "submit_time": self._submit_time}
+
+    def update(self, delta_time):
+        """
+        Update each object in the game.
+        :param delta_time: tells us how much time has actually elapsed
+        """
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+        
+        if self.simulation is not None:
+            # The thread keeps its own clock; the window only draws what it publishes.
+            self.simulation.start()
+            return
+        
+        ticks = self.clock.advance(delta_time)
+        if ticks == 0:
+            return
+        
+        start = time.perf_counter()
+        particle_stride = 1
+        if self.budget is not None:
+            self.engine.collision_stride = self.budget.collision_stride()
+            particle_stride = self.budget.particle_stride()
+        
+        # Shots fire on the first tick of the frame; held keys apply to every tick.
+        held = [KEY_ACTIONS[key] for key in self.held_keys if key in KEY_ACTIONS]
+        inputs = held + [FIRE] * self._shots
+        self._shots = 0
+        for tick in range(ticks):
+            self.engine.step(inputs)
+            if self.rewind is not None:
+                self.rewind.record(self.engine)
+            if self.particles is not None:
+                self._particle_lag += self.engine.tick_scale
+                if self.engine.ticks % particle_stride == 0:
+                    self.particles.step(self._particle_lag)
+                    self._particle_lag = 0.0
+            inputs = held
+        self._update_time += time.perf_counter() - start
+        
+    def on_key_press(self, key: int, modifiers: int):
+        """
+        Puts the current key in the set of keys that are being held.
+        SPACE fires a bullet on the next engine step.
+        """
+        if self.simulation is not None:
+            self.simulation.inputs.append((KEY_DOWN, key))
+        elif self.engine.ship.alive:
+            self.held_keys.add(key)
+
+            if key == arcade.key.SPACE:
+                self._shots += 1
+        
+        if key == PROFILER_KEY:
+            self.toggle_profiler()
+        elif key == TRACE_KEY and self.profiler is not None:
+            self.profiler.export_trace(TRACE_FILE)
+            print("Profiler trace written to %s" % TRACE_FILE)
+        elif key == REWIND_KEY and self.rewind is not None:
+            self.rewind.rewind(self.engine, REWIND_STEP_SECONDS)
+
+    def on_key_release(self, key: int, modifiers: int):
+        """
+        Removes the current key from the set of held keys.
+        """
+        if self.simulation is not None:
+            self.simulation.inputs.append((KEY_UP, key))
+        elif key in self.held_keys:
+            self.held_keys.remove(key)
+
+    def on_close(self):
+        '''Stop the simulation thread before the window goes.'''
+        if self.simulation is not None:
+            self.simulation.stop()
+        super().on_close()
+
+class Remote_Game(arcade.Window):
+    """
+    This class is a thin client window. The field is simulated by a
+    server; the window only sends the keys and draws the last state
+    received with the same sprite renderer as the game.
+    """
+
+    def __init__(self, client):
+        """
+        Sets up a window on a connected server
+        :param client: a Net_Client connected to the server
+        """
+        super().__init__(client.width, client.height, "Asteroids - player %d" % client.player,
+                         update_rate=1 / DISPLAY_RATE)
+        arcade.set_background_color(arcade.color.SMOKY_BLACK)
+
+        self.client = client
+        self.held_keys = set()
+        self._shots = 0
+        self._objects = {}
+        self.renderer = Sprite_Renderer([SHIP_IMAGE, BULLET_IMAGE, BIG_ROCK_IMAGE, MEDIUM_ROCK_IMAGE, SMALL_ROCK_IMAGE])
+
+    def on_draw(self):
+        """
+        Called automatically by the arcade framework.
+        Draws the last state received from the server.
+        """
+        arcade.start_render()
+        self.renderer.draw(self._objects.values())
+
+    def update(self, delta_time):
+        """
+        Send the keys and apply the states received since the last frame.
+        :param delta_time: tells us how much time has actually elapsed
+        """
+        mask = 0
+        for key in self.held_keys:
+            if key in KEY_ACTIONS:
+                mask |= ACTION_BITS[KEY_ACTIONS[key]]
+        self.client.send_input(mask, self._shots)
+        self._shots = 0
+
+        entities = self.client.poll()
+        for net_id in [net_id for net_id in self._objects if net_id not in entities]:
+            del self._objects[net_id]
+        for net_id, (kind, x, y, angle) in entities.items():
+            obj = self._objects.get(net_id)
+            if obj is None or obj.kind != kind:
+                obj = self._objects[net_id] = Remote_Object(kind)
+            obj.center.set_x(x)
+            obj.center.set_y(y)
+            obj._angle = angle
+        if self.client.closed:
+            self.close()
+
+    def on_key_press(self, key: int, modifiers: int):
+        """
+        Puts the current key in the set of keys that are being held.
+        SPACE fires a bullet on the next input sent.
+        """
+        self.held_keys.add(key)
+        if key == arcade.key.SPACE:
+            self._shots += 1
+
+    def on_key_release(self, key: int, modifiers: int):
+        """
+        Removes the current key from the set of held keys.
+        """
+        self.held_keys.discard(key)
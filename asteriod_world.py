@@ -0,0 +1,208 @@
+"""
+File: asteriod_world.py
+This module implements an optional NumPy world for the asteroids game.
+Positions, velocities, angles, spins, radii, lifetimes and alive flags of
+every flying object live in contiguous arrays and one tick is a handful of
+vectorized operations. The game objects stay as thin views over array rows.
+Everything wraps around the field by modulo, as it does on plain objects,
+so a game plays the same with or without a world; a recording replayed
+with asteriod_replay.py --other-mode checks it. Only fields wide enough
+for far asteriods to move in bulk on plain objects differ, by rounding.
+"""
+from asteriod_numpy import np, require_numpy
+
+INITIAL_WORLD_CAPACITY = 64
+
+class World_Field():
+    '''Attribute of a game object that lives in a world array once the object is bound.
+    Until then it is kept in the "_local_" slot of the array name, which the class must declare.'''
+    def __init__(self, array_name, cast):
+        self._array_name = array_name
+        self._cast = cast
+        self._slot = "_local_" + array_name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        world = obj._world
+        if world is None:
+            return getattr(obj, self._slot)
+        return self._cast(getattr(world, self._array_name)[obj._row])
+
+    def __set__(self, obj, value):
+        world = obj._world
+        if world is None:
+            setattr(obj, self._slot, value)
+        else:
+            getattr(world, self._array_name)[obj._row] = value
+
+class World_Point():
+    def __init__(self, world, row):
+        '''Intialize a point that reads and writes one row of the world.'''
+        self._world = world
+        self._row = row
+
+    def set_x(self, value):
+        '''Set x coordinate of an object.'''
+        self._world.pos[self._row, 0] = value
+
+    def set_y(self, value):
+        '''Set y coordinate of an object.'''
+        self._world.pos[self._row, 1] = value
+
+    def get_x(self):
+        '''Return x coordinate of an object.'''
+        return float(self._world.pos[self._row, 0])
+
+    def get_y(self):
+        '''Return y coordinate of an object.'''
+        return float(self._world.pos[self._row, 1])
+
+class World_Velocity():
+    def __init__(self, world, row):
+        '''Intialize a velocity that reads and writes one row of the world.'''
+        self._world = world
+        self._row = row
+
+    def set_dx(self, value):
+        '''Set rate of change of the x coordinate of an object.'''
+        self._world.vel[self._row, 0] += value
+
+    def set_dy(self, value):
+        '''Set rate of change of the y coordinate of an object.'''
+        self._world.vel[self._row, 1] += value
+
+    def get_dx(self):
+        '''Return rate of change of the x coordinate of an object.'''
+        return float(self._world.vel[self._row, 0])
+
+    def get_dy(self):
+        '''Return rate of change of the y coordinate of an object.'''
+        return float(self._world.vel[self._row, 1])
+
+    def reset(self):
+        '''Stop the object.'''
+        self._world.vel[self._row] = 0.0
+
+class World():
+    def __init__(self, width, height, capacity=INITIAL_WORLD_CAPACITY):
+        '''Intialize empty world arrays for a toroidal field of width x height.'''
+        require_numpy("The NumPy world")
+        self.width = width
+        self.height = height
+        self._size = np.array([width, height], dtype=np.float64)
+        self.capacity = 0
+        self._free_rows = []
+        self.pos = np.zeros((0, 2), dtype=np.float64)
+        self.vel = np.zeros((0, 2), dtype=np.float64)
+        self.angle = np.zeros(0, dtype=np.float64)
+        self.spin = np.zeros(0, dtype=np.float64)
+        self.radius = np.zeros(0, dtype=np.float64)
+        self.life = np.zeros(0, dtype=np.float64)
+        self.life_limit = np.zeros(0, dtype=np.float64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.active = np.zeros(0, dtype=bool)
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        '''Make room for at least capacity rows, keeping the current rows.'''
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        self.pos = np.concatenate([self.pos, np.zeros((extra, 2))])
+        self.vel = np.concatenate([self.vel, np.zeros((extra, 2))])
+        self.angle = np.concatenate([self.angle, np.zeros(extra)])
+        self.spin = np.concatenate([self.spin, np.zeros(extra)])
+        self.radius = np.concatenate([self.radius, np.zeros(extra)])
+        self.life = np.concatenate([self.life, np.zeros(extra)])
+        self.life_limit = np.concatenate([self.life_limit, np.zeros(extra)])
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+
+        # Hand out low rows first so live objects stay packed together.
+        self._free_rows.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def count(self):
+        '''Return how many objects are bound to the world.'''
+        return self.capacity - len(self._free_rows)
+
+    def bind(self, obj, life_limit=0):
+        '''Move the state of a game object into a world row and turn it into a view of that row.'''
+        if not self._free_rows:
+            self._grow(self.capacity * 2)
+        row = self._free_rows.pop()
+
+        self.pos[row] = (obj.center.get_x(), obj.center.get_y())
+        self.vel[row] = (obj.velocity.get_dx(), obj.velocity.get_dy())
+        self.angle[row] = obj._angle
+        self.spin[row] = getattr(obj, "_spin", 0)
+        self.radius[row] = obj.radius
+        self.life[row] = getattr(obj, "_life", 0)
+        self.life_limit[row] = life_limit
+        self.alive[row] = obj.alive
+        self.active[row] = True
+
+        # Keep the plain point and velocity to give them back on unbind.
+        obj._plain = (obj.center, obj.velocity)
+        obj._world = self
+        obj._row = row
+        obj.center = World_Point(self, row)
+        obj.velocity = World_Velocity(self, row)
+        return row
+
+    def unbind(self, obj):
+        '''Copy the state of a row back into its game object and free the row.'''
+        row = obj._row
+        angle, alive, life = float(self.angle[row]), bool(self.alive[row]), float(self.life[row])
+        center, velocity = obj._plain
+        center.set_x(float(self.pos[row, 0]))
+        center.set_y(float(self.pos[row, 1]))
+        velocity.reset()
+        velocity.set_dx(float(self.vel[row, 0]))
+        velocity.set_dy(float(self.vel[row, 1]))
+
+        obj._world = None
+        obj.center = center
+        obj.velocity = velocity
+        obj._angle = angle
+        obj.alive = alive
+        if hasattr(type(obj), "_life"):
+            obj._life = life
+
+        self.vel[row] = 0.0
+        self.spin[row] = 0.0
+        self.life_limit[row] = 0
+        self.alive[row] = False
+        self.active[row] = False
+        self._free_rows.append(row)
+
+    def set_velocities(self, rows, velocities):
+        '''Set the velocity of many rows at once, from a buffer of rows and a flat buffer of dx, dy pairs.'''
+        self.vel[np.asarray(rows, dtype=np.intp)] = np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+
+    def set_spins(self, rows, spin):
+        '''Set the spin of many rows at once, to one value or one for every row.'''
+        self.spin[np.asarray(rows, dtype=np.intp)] = spin
+
+    def max_speed(self, rows):
+        '''Return the highest speed of some rows, 0 for none.'''
+        if not len(rows):
+            return 0.0
+        velocities = self.vel[rows]
+        return float(np.sqrt((velocities * velocities).sum(axis=1).max()))
+
+    def step(self, scale=1.0):
+        '''Advance every object by scale base ticks: integrate, spin, wrap and age.'''
+        # Free rows have no velocity, spin or life limit so they never change.
+        if scale == 1.0:
+            self.pos += self.vel
+            self.angle += self.spin
+        else:
+            self.pos += self.vel * scale
+            self.angle += self.spin * scale
+        np.mod(self.pos, self._size, out=self.pos)
+
+        aging = self.life_limit > 0
+        self.life += aging * scale
+        self.alive &= ~(aging & (self.life >= self.life_limit))